@@ -3,46 +3,71 @@ Configuration management for Colony OS Worker Bees
 """
 
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration for Worker Bees"""
-    
-    def __init__(self):
-        # Colony OS Configuration
-        self.colonies_server_host = os.environ.get('COLONIES_SERVER_HOST', 'http://localhost:8080')
-        self.colonies_executor_prvkey = os.environ.get('COLONIES_EXECUTOR_PRVKEY')
-        self.colonies_colony_name = os.environ.get('COLONIES_COLONY_NAME', 'zyeute-colony')
-        
-        # Supabase Configuration
-        self.supabase_url = os.environ.get('SUPABASE_URL') or os.environ.get('VITE_SUPABASE_URL')
-        self.supabase_service_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
-        
-        # Stripe Configuration
-        self.stripe_secret_key = os.environ.get('STRIPE_SECRET_KEY')
-        
-        # Worker Configuration
-        self.executor_name = os.environ.get('EXECUTOR_NAME', 'zyeute-finance-bee-01')
-        self.executor_type = os.environ.get('EXECUTOR_TYPE', 'finance-worker')
-        self.poll_timeout = int(os.environ.get('POLL_TIMEOUT', '10'))  # seconds
-        
+    """Configuration for Worker Bees (resolved once, immutable afterwards)"""
+
+    # Colony OS Configuration
+    colonies_server_host: str = 'http://localhost:8080'
+    colonies_executor_prvkey: Optional[str] = None
+    colonies_colony_name: str = 'zyeute-colony'
+
+    # Supabase Configuration
+    supabase_url: Optional[str] = None
+    supabase_service_key: Optional[str] = None
+
+    # Stripe Configuration
+    stripe_secret_key: Optional[str] = None
+
+    # Worker Configuration
+    executor_name: str = 'zyeute-finance-bee-01'
+    executor_type: str = 'finance-worker'
+    poll_timeout: int = 60  # seconds (long poll returns as soon as a job is queued)
+    max_concurrency: int = 3  # processes handled in parallel
+
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """Build configuration from environment variables"""
+        env = os.environ
+        return cls(
+            colonies_server_host=env.get('COLONIES_SERVER_HOST', 'http://localhost:8080'),
+            colonies_executor_prvkey=env.get('COLONIES_EXECUTOR_PRVKEY'),
+            colonies_colony_name=env.get('COLONIES_COLONY_NAME', 'zyeute-colony'),
+            supabase_url=env.get('SUPABASE_URL') or env.get('VITE_SUPABASE_URL'),
+            supabase_service_key=env.get('SUPABASE_SERVICE_ROLE_KEY'),
+            stripe_secret_key=env.get('STRIPE_SECRET_KEY'),
+            executor_name=env.get('EXECUTOR_NAME', 'zyeute-finance-bee-01'),
+            executor_type=env.get('EXECUTOR_TYPE', 'finance-worker'),
+            poll_timeout=int(env.get('POLL_TIMEOUT', '60')),
+            max_concurrency=int(env.get('MAX_CONCURRENCY', '3')),
+        )
+
     def validate(self) -> tuple[bool, Optional[str]]:
         """Validate required configuration"""
         if not self.colonies_executor_prvkey:
             return False, "Missing COLONIES_EXECUTOR_PRVKEY"
-        
+
         if not self.supabase_url:
             return False, "Missing SUPABASE_URL"
-        
+
         if not self.supabase_service_key:
             return False, "Missing SUPABASE_SERVICE_ROLE_KEY"
-        
+
         if not self.stripe_secret_key:
             return False, "Missing STRIPE_SECRET_KEY"
-        
+
         return True, None
-    
+
     def __repr__(self):
         return f"Config(server={self.colonies_server_host}, executor={self.executor_name})"
 
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Process-wide configuration, read from the environment on first use"""
+    return Config.from_env()
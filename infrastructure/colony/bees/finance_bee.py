@@ -11,10 +11,17 @@ Location: infrastructure/colony/bees/finance_bee.py
 import os
 import sys
 import json
+import re
+import random
+import signal
 import time
+import logging
+import threading
 import traceback
-from datetime import datetime
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Dict, Any, Union
 
 # Colony OS SDK
 try:
@@ -38,100 +45,292 @@ except ImportError:
     print("❌ stripe not installed. Run: pip install stripe")
     sys.exit(1)
 
+# HTTP client for Stripe connection pooling
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    print("❌ requests not installed. Run: pip install requests")
+    sys.exit(1)
+
+# Fast JSON parser for webhook payloads (optional)
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 # Local imports
-from config import Config
+from config import get_config
 from guardian import Guardian
+from resilience import CircuitBreaker, CircuitOpenError, RetryBudget
+
+logger = logging.getLogger(__name__)
+
+# Process-wide cap on retries so a Stripe/Supabase outage does not turn
+# every in-flight call into a retry loop against the degraded service
+_retry_budget = RetryBudget(capacity=10, refill_per_second=0.5)
+
+# Stop calling a service for 30s after 5 consecutive failed attempts, so
+# worker slots fail fast (leaving the process for Colony to re-dispatch)
+# instead of backing off against it
+_supabase_breaker = CircuitBreaker('supabase', fail_max=5, reset_timeout=30)
+_stripe_breaker = CircuitBreaker('stripe', fail_max=5, reset_timeout=30)
+
+# Errors that retrying cannot fix, by type and by message
+_NON_RETRYABLE_ERRORS = (
+    stripe.InvalidRequestError,
+    stripe.AuthenticationError,
+    stripe.PermissionError,
+)
+_NON_RETRYABLE_RE = re.compile(r'invalid|not found|unauthorized|forbidden', re.IGNORECASE)
+
+# Colony dispatches of a process before a transient failure is parked in
+# the DLQ; earlier failures leave the process for Colony to re-dispatch
+_DLQ_AFTER_ATTEMPTS = 3
+
+# Upper bound on a single retry delay, in seconds
+_RETRY_DELAY_MAX = 30.0
+
+# Stripe API request timeout, in seconds
+_STRIPE_TIMEOUT = 10
+
+# A 'processing' event claim older than this (seconds) was abandoned (bee
+# killed mid-handler) and may be taken over; well above a full retry cycle
+_CLAIM_STALE_AFTER = 300
+
+# Longest pause between assign() attempts while the Colony server errors
+_LOOP_BACKOFF_MAX = 30.0
+
+# Recently handled Stripe event ids remembered in-process, so replays
+# during a retry storm are answered without a Supabase round trip
+_SEEN_EVENTS_MAX = 10000
+
+# Stripe subscriptions are kept briefly after a fetch so retried or
+# closely spaced events for the same subscription skip the API call
+_SUBSCRIPTION_CACHE_TTL = 30.0  # seconds
+_SUBSCRIPTION_CACHE_MAX = 1024
+
+
+class BeeInitError(RuntimeError):
+    """Raised when a bee cannot be initialized (bad config, unreachable service)"""
+
+
+class UnrecoverableError(RuntimeError):
+    """Raised for task failures that no retry can fix (bad payload, missing profile)"""
+
+
+class EventInProgressError(RuntimeError):
+    """Raised when another worker holds a fresh claim on a Stripe event"""
+
+
+@lru_cache(maxsize=None)
+def _supabase_client(url: str, key: str) -> Client:
+    """
+    Process-wide Supabase client
+
+    create_client() builds the auth and PostgREST HTTP sessions, so it is
+    created once per (url, key) and shared by every FinanceBee instance.
+    """
+    return create_client(url, key)
+
+
+@lru_cache(maxsize=16)
+def _executor_id(prvkey: str) -> str:
+    """
+    Executor id derived from its private key
+    
+    The derivation is deterministic elliptic-curve work, so it is done once
+    per key for every bee started in the same process.
+    """
+    return Crypto().id(prvkey)
+
+
+@lru_cache(maxsize=4096)
+def _ts_iso(ts: int) -> str:
+    """
+    ISO 8601 UTC string for a Stripe Unix timestamp
+    
+    Subscription periods share boundaries across many customers and Stripe
+    retries, so the formatted strings are cached.
+    """
+    return time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(ts))
+
+
+def _stripe_http_client(pool_size: int) -> 'stripe.RequestsClient':
+    """
+    Stripe HTTP client backed by one keep-alive connection pool
+    
+    The pool is sized to the bee's worker threads so each in-flight handler
+    reuses an open TLS connection to api.stripe.com instead of handshaking.
+    Retries stay with _execute_with_retry, so the adapter does not retry.
+    Requests time out after _STRIPE_TIMEOUT seconds rather than the SDK's
+    80s default, so a stalled call cannot hold a worker slot for long.
+    """
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    return stripe.RequestsClient(timeout=_STRIPE_TIMEOUT, session=session)
+
+
+def _error_chain(error: Optional[BaseException]):
+    """Yield a task error and every error it was raised from"""
+    while error is not None:
+        yield error
+        error = error.__cause__
+
+
+def _is_unrecoverable(error: BaseException) -> bool:
+    """
+    Check whether a task error (or any error it was raised from) is one
+    that retrying cannot fix
+    """
+    return any(
+        isinstance(e, (UnrecoverableError,) + _NON_RETRYABLE_ERRORS) or _NON_RETRYABLE_RE.search(str(e))
+        for e in _error_chain(error)
+    )
+
+
+def _is_circuit_open(error: BaseException) -> bool:
+    """Check whether a task failed because a service circuit refused the call"""
+    return any(isinstance(e, CircuitOpenError) for e in _error_chain(error))
+
+
+def _on_sigterm(signum, frame):
+    """Route systemd's stop signal (SIGTERM) into the same drain as Ctrl+C"""
+    raise KeyboardInterrupt
 
 
 class FinanceBee:
     """Finance Worker Bee for Stripe webhook processing"""
     
-    def _execute_with_retry(self, func, max_retries=3, base_delay=1, operation_name="operation"):
+    def _execute_with_retry(self, func, max_retries=3, base_delay=1, operation_name="operation", breaker=None,
+                            max_delay=_RETRY_DELAY_MAX):
         """
         Execute function with exponential backoff retry
         
+        Delays use full jitter (uniform between 0 and the backoff step) so
+        bees retrying the same outage do not hit the service in lockstep.
+        
         Args:
             func: Function to execute
             max_retries: Maximum number of retry attempts
-            base_delay: Base delay in seconds (doubles each retry)
+            base_delay: Base delay in seconds (backoff step doubles each retry)
             operation_name: Name of operation for logging
+            breaker: CircuitBreaker for the service being called, if any
+            max_delay: Upper bound in seconds for any single backoff step
             
         Returns:
             Result from function
             
         Raises:
+            CircuitOpenError: If the service's circuit is open
             Exception: If all retries exhausted
         """
         for attempt in range(max_retries):
+            if breaker is not None:
+                breaker.before_call()
+            
             try:
-                return func()
+                result = func()
             except Exception as e:
                 # Check if error is retryable
-                error_str = str(e).lower()
-                non_retryable = ['invalid', 'not found', 'unauthorized', 'forbidden']
-                
-                if any(term in error_str for term in non_retryable):
-                    # Don't retry non-retryable errors
-                    print(f"   ❌ Non-retryable error in {operation_name}: {e}")
+                if isinstance(e, _NON_RETRYABLE_ERRORS) or _NON_RETRYABLE_RE.search(str(e)):
+                    # Don't retry non-retryable errors (the service did answer)
+                    logger.error("   ❌ Non-retryable error in %s: %s", operation_name, e)
                     raise
                 
+                if breaker is not None:
+                    breaker.record_failure()
+                
                 if attempt == max_retries - 1:
                     # Last attempt failed
-                    print(f"   ❌ {operation_name} failed after {max_retries} attempts")
+                    logger.error("   ❌ %s failed after %d attempts", operation_name, max_retries)
+                    raise
+                
+                if not _retry_budget.try_acquire():
+                    # Too many retries in flight across the bee; fail fast
+                    logger.error("   ❌ Retry budget exhausted, not retrying %s: %s", operation_name, e)
                     raise
                 
-                # Calculate delay with exponential backoff
-                delay = base_delay * (2 ** attempt)
-                print(f"   ⚠️  {operation_name} failed (attempt {attempt + 1}/{max_retries}), retrying in {delay}s: {e}")
+                # Calculate delay with exponential backoff and full jitter
+                delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+                logger.warning(
+                    "   ⚠️  %s failed (attempt %d/%d), retrying in %.2fs: %s",
+                    operation_name, attempt + 1, max_retries, delay, e
+                )
                 time.sleep(delay)
+            else:
+                if breaker is not None:
+                    breaker.record_success()
+                return result
     
     def __init__(self):
-        print("🐝 Initializing Finance Bee...")
+        logger.info("🐝 Initializing Finance Bee...")
         
         # Load configuration
-        self.config = Config()
+        self.config = get_config()
         is_valid, error = self.config.validate()
         if not is_valid:
-            print(f"❌ Configuration error: {error}")
-            sys.exit(1)
+            raise BeeInitError(f"Configuration error: {error}")
         
-        print(f"✅ Configuration loaded: {self.config}")
+        logger.info("✅ Configuration loaded: %s", self.config)
         
         # Initialize Guardian
         self.guardian = Guardian()
-        print("✅ Guardian initialized")
+        logger.info("✅ Guardian initialized")
         
         # Initialize Colony OS client
         try:
             self.colonies, self.colonyname, self.colony_prvkey, _, _ = colonies_client()
-            self.crypto = Crypto()
-            print("✅ Colony OS client initialized")
+            logger.info("✅ Colony OS client initialized")
         except Exception as e:
-            print(f"❌ Failed to initialize Colony OS client: {e}")
-            sys.exit(1)
+            raise BeeInitError(f"Failed to initialize Colony OS client: {e}") from e
         
         # Set up executor identity
         self.executor_prvkey = self.config.colonies_executor_prvkey
-        self.executorid = self.crypto.id(self.executor_prvkey)
+        self.executorid = _executor_id(self.executor_prvkey)
         self.executorname = self.config.executor_name
         self.executortype = self.config.executor_type
         
-        print(f"✅ Executor identity: {self.executorname} ({self.executorid})")
+        logger.info("✅ Executor identity: %s (%s)", self.executorname, self.executorid)
         
         # Initialize Supabase client
         try:
-            self.supabase: Client = create_client(
+            self.supabase: Client = _supabase_client(
                 self.config.supabase_url,
                 self.config.supabase_service_key
             )
-            print("✅ Supabase client initialized")
+            logger.info("✅ Supabase client initialized")
         except Exception as e:
-            print(f"❌ Failed to initialize Supabase client: {e}")
-            sys.exit(1)
+            raise BeeInitError(f"Failed to initialize Supabase client: {e}") from e
         
         # Initialize Stripe client
         stripe.api_key = self.config.stripe_secret_key
-        print("✅ Stripe client initialized")
+        stripe.default_http_client = _stripe_http_client(self.config.max_concurrency)
+        logger.info("✅ Stripe client initialized")
+        
+        # Task dispatch table (Colony funcname -> handler), bound once
+        self._tasks = {
+            'validate_revenue': self.validate_revenue,
+        }
+        
+        # Stripe event dispatch table (event type -> handler)
+        self._handlers = {
+            'checkout.session.completed': self._handle_checkout_completed,
+            'customer.subscription.updated': self._handle_subscription_updated,
+            'customer.subscription.deleted': self._handle_subscription_deleted,
+        }
+        
+        # Recently handled Stripe event ids (ordered set used as an LRU,
+        # bounded by _SEEN_EVENTS_MAX; values are unused)
+        self._seen_events: OrderedDict = OrderedDict()
+        self._seen_lock = threading.Lock()
+        
+        # Short-lived Stripe subscription cache (id -> (expires_at, subscription))
+        self._subscription_cache: OrderedDict = OrderedDict()
+        self._subscription_lock = threading.Lock()
+        
+        # Worker slots: a process is only assigned when one is free
+        self._slots = threading.BoundedSemaphore(self.config.max_concurrency)
         
         # Register executor
         self.register_executor()
@@ -156,18 +355,18 @@ class FinanceBee:
                 self.colony_prvkey
             )
             
-            print(f"✅ Executor {self.executorname} registered and approved")
+            logger.info("✅ Executor %s registered and approved", self.executorname)
         except Exception as e:
             # Registration might fail if executor already exists
-            print(f"ℹ️  Executor registration: {e}")
-            print("   (This is OK if executor already exists)")
+            logger.info("ℹ️  Executor registration: %s", e)
+            logger.info("   (This is OK if executor already exists)")
     
-    def validate_revenue(self, payload_json: str) -> str:
+    def validate_revenue(self, payload_json: Union[str, bytes, Dict[str, Any]]) -> str:
         """
         Core business logic for revenue validation
         
         Args:
-            payload_json: JSON string containing Stripe event
+            payload_json: Stripe event as a JSON string, or already decoded
             
         Returns:
             Result message
@@ -176,275 +375,472 @@ class FinanceBee:
             RuntimeError: If processing fails
         """
         try:
-            # Parse payload
-            payload = json.loads(payload_json)
+            # Parse payload (unless Guardian already decoded it)
+            payload = payload_json if isinstance(payload_json, dict) else json_loads(payload_json)
             
             # Guardian validation
             is_valid, reason = self.guardian.validate_stripe_payload(payload)
             if not is_valid:
-                raise RuntimeError(f"Guardian blocked payload: {reason}")
+                raise UnrecoverableError(f"Guardian blocked payload: {reason}")
             
             event_type = payload.get('type')
-            print(f"   Processing event: {event_type}")
+            event_id = payload.get('id')
+            logger.debug("   Processing event: %s", event_type)
             
-            # Handle checkout.session.completed
-            if event_type == 'checkout.session.completed':
-                return self._handle_checkout_completed(payload)
+            handler = self._handlers.get(event_type)
+            if handler is None:
+                return f"Event {event_type} received (no action taken)"
             
-            # Handle subscription updates
-            elif event_type == 'customer.subscription.updated':
-                return self._handle_subscription_updated(payload)
+            # Stripe delivers at least once: claim the event id before any
+            # Stripe or database work so redeliveries short-circuit here
+            if event_id and (event_id in self._seen_events or not self._claim_event(event_id, event_type)):
+                self._remember_event(event_id)
+                logger.info("   ℹ️  Event %s already processed (duplicate delivery)", event_id)
+                return f"Event {event_id} already processed (idempotent)"
             
-            # Handle subscription cancellations
-            elif event_type == 'customer.subscription.deleted':
-                return self._handle_subscription_deleted(payload)
+            try:
+                result = handler(payload)
+            except Exception:
+                # Release the claim so a retry of this event is not skipped
+                # (if this fails too, the claim goes stale and is reclaimed)
+                if event_id:
+                    self._release_event(event_id)
+                raise
             
-            else:
-                return f"Event {event_type} received (no action taken)"
+            if event_id:
+                self._complete_event(event_id)
+                self._remember_event(event_id)
+            return result
+        
+        except Exception as e:
+            # The log handler renders the traceback; the error result stays short
+            logger.exception("❌ Processing failed: %s", e)
+            raise RuntimeError(f"Processing failed: {e}") from e
+    
+    def _claim_event(self, event_id: str, event_type: str) -> bool:
+        """
+        Claim a Stripe event id in the processed_stripe_events ledger
+        
+        The claim is recorded as 'processing' and only becomes 'done' via
+        _complete_event, so a bee killed mid-handler leaves a claim that is
+        reclaimed after _CLAIM_STALE_AFTER seconds instead of one that hides
+        the event forever.
+        
+        Args:
+            event_id: Stripe event ID (evt_...)
+            event_type: Stripe event type
+            
+        Returns:
+            True if this worker now owns the event, False if already processed
+            
+        Raises:
+            EventInProgressError: If another worker holds a fresh claim
+        """
+        result = self._execute_with_retry(
+            lambda: self.supabase.rpc('claim_stripe_event', {
+                'p_event_id': event_id,
+                'p_event_type': event_type,
+                'p_stale_after_seconds': _CLAIM_STALE_AFTER,
+            }).execute(),
+            operation_name="Claim event",
+            breaker=_supabase_breaker
+        )
         
+        if result.data == 'busy':
+            raise EventInProgressError(f"Event {event_id} is being processed by another worker")
+        return result.data == 'claimed'
+    
+    def _complete_event(self, event_id: str):
+        """Mark a claimed event id as handled"""
+        try:
+            self._execute_with_retry(
+                lambda: self.supabase.table('processed_stripe_events').update({
+                    'status': 'done',
+                }, returning='minimal').eq('event_id', event_id).execute(),
+                operation_name="Complete event",
+                breaker=_supabase_breaker
+            )
         except Exception as e:
-            error_msg = f"Processing failed: {str(e)}\n{traceback.format_exc()}"
-            print(f"❌ {error_msg}")
-            raise RuntimeError(error_msg)
+            # The claim goes stale and a redelivery re-runs the (idempotent) handler
+            logger.error("   ⚠️  Failed to mark event %s done: %s", event_id, e)
+    
+    def _remember_event(self, event_id: str):
+        """Record a handled event id in the in-process LRU"""
+        with self._seen_lock:
+            self._seen_events[event_id] = None
+            self._seen_events.move_to_end(event_id)
+            if len(self._seen_events) > _SEEN_EVENTS_MAX:
+                self._seen_events.popitem(last=False)
+    
+    def _release_event(self, event_id: str):
+        """Remove this worker's 'processing' claim after a failed attempt"""
+        try:
+            self.supabase.table('processed_stripe_events').delete().eq('event_id', event_id).eq('status', 'processing').execute()
+        except Exception as e:
+            logger.error("   ⚠️  Failed to release event %s (reclaimable in %ss): %s", event_id, _CLAIM_STALE_AFTER, e)
+    
+    def _get_subscription(self, subscription_id: str):
+        """
+        Retrieve a Stripe subscription (with retry), reusing a copy from the
+        last _SUBSCRIPTION_CACHE_TTL seconds
+        
+        Args:
+            subscription_id: Stripe subscription ID (sub_...)
+            
+        Returns:
+            Stripe subscription object
+        """
+        with self._subscription_lock:
+            cached = self._subscription_cache.get(subscription_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+        
+        subscription = self._execute_with_retry(
+            lambda: stripe.Subscription.retrieve(subscription_id),
+            operation_name="Stripe subscription retrieve",
+            breaker=_stripe_breaker
+        )
+        self._cache_subscription(subscription_id, subscription)
+        return subscription
+    
+    def _cache_subscription(self, subscription_id: str, subscription):
+        """Store a subscription in the short-lived cache"""
+        with self._subscription_lock:
+            self._subscription_cache[subscription_id] = (
+                time.monotonic() + _SUBSCRIPTION_CACHE_TTL,
+                subscription,
+            )
+            self._subscription_cache.move_to_end(subscription_id)
+            if len(self._subscription_cache) > _SUBSCRIPTION_CACHE_MAX:
+                self._subscription_cache.popitem(last=False)
+    
+    def _forget_subscription(self, subscription_id: str):
+        """Drop a subscription from the short-lived cache"""
+        with self._subscription_lock:
+            self._subscription_cache.pop(subscription_id, None)
     
     def _handle_checkout_completed(self, payload: Dict[str, Any]) -> str:
         """
         Handle checkout.session.completed event
         
-        Uses compensating transactions pattern for atomicity:
-        - Store original state before updates
-        - On failure, rollback changes
-        - Idempotency via stripe_subscription_id
+        The profile upgrade and subscription upsert run in one transaction
+        via the activate_subscription() RPC; idempotency via
+        stripe_subscription_id.
         """
         session = payload['data']['object']
-        user_id = session['metadata'].get('userId')
-        tier = session['metadata'].get('tier')
-        subscription_id = session.get('subscription')
+        metadata = session.get('metadata') or {}
+        user_id = metadata.get('userId')
+        tier = metadata.get('tier')
+        
+        # The session carries the full subscription object when the checkout
+        # was created with expand=['subscription'], otherwise only its id
+        subscription = session.get('subscription')
+        subscription_id = subscription.get('id') if isinstance(subscription, dict) else subscription
+        customer_id = session.get('customer')
         
         if not user_id or not tier or not subscription_id:
-            raise RuntimeError(f"Missing required metadata: userId={user_id}, tier={tier}, subscription={subscription_id}")
+            raise UnrecoverableError(f"Missing required metadata: userId={user_id}, tier={tier}, subscription={subscription_id}")
         
         # Check for idempotency - if subscription already exists, skip
-        existing_sub = self.supabase.table('subscriptions').select('id').eq('stripe_subscription_id', subscription_id).execute()
-        if existing_sub.data and len(existing_sub.data) > 0:
-            print(f"   ℹ️  Subscription {subscription_id} already processed (idempotent)")
+        existing_sub = self.supabase.table('subscriptions').select('id').eq('stripe_subscription_id', subscription_id).limit(1).execute()
+        if existing_sub.data:
+            logger.info("   ℹ️  Subscription %s already processed (idempotent)", subscription_id)
             return f"Subscription already activated for user {user_id}: {tier} (idempotent)"
         
-        # Get original user profile state for rollback
-        original_profile = self.supabase.table('user_profiles').select('subscription_tier, is_premium').eq('id', user_id).execute()
-        original_state = original_profile.data[0] if original_profile.data else None
+        # Get subscription period, only calling Stripe (with retry) when the
+        # webhook did not already include the expanded subscription
+        if not isinstance(subscription, dict) or not {'current_period_start', 'current_period_end'} <= subscription.keys():
+            subscription = self._get_subscription(subscription_id)
+        current_period_start = _ts_iso(int(subscription['current_period_start']))
+        current_period_end = _ts_iso(int(subscription['current_period_end']))
         
-        # Get subscription period from Stripe (with retry)
-        subscription = self._execute_with_retry(
-            lambda: stripe.Subscription.retrieve(subscription_id),
-            operation_name="Stripe subscription retrieve"
+        # Upgrade profile and record subscription (with retry)
+        result = self._execute_with_retry(
+            lambda: self.supabase.rpc('activate_subscription', {
+                'p_user_id': user_id,
+                'p_tier': tier,
+                'p_subscription_id': subscription_id,
+                'p_customer_id': customer_id,
+                'p_period_start': current_period_start,
+                'p_period_end': current_period_end,
+            }).execute(),
+            operation_name="Activate subscription",
+            breaker=_supabase_breaker
         )
-        current_period_start = datetime.fromtimestamp(subscription.current_period_start).isoformat()
-        current_period_end = datetime.fromtimestamp(subscription.current_period_end).isoformat()
         
-        try:
-            # Step 1: Update user profile (with retry)
-            profile_result = self._execute_with_retry(
-                lambda: self.supabase.table('user_profiles').update({
-                    'subscription_tier': tier,
-                    'is_premium': True,
-                }).eq('id', user_id).execute(),
-                operation_name="Update user_profiles"
-            )
-            
-            if not profile_result.data:
-                raise RuntimeError(f"Failed to update user_profiles for user {user_id}")
-            
-            # Step 2: Create subscription record (with retry)
-            sub_result = self._execute_with_retry(
-                lambda: self.supabase.table('subscriptions').upsert({
-                    'subscriber_id': user_id,
-                    'creator_id': user_id,
-                    'status': 'active',
-                    'stripe_subscription_id': subscription_id,
-                    'stripe_customer_id': session.get('customer'),
-                    'current_period_start': current_period_start,
-                    'current_period_end': current_period_end,
-                }, on_conflict='stripe_subscription_id').execute(),
-                operation_name="Upsert subscription"
-            )
-            
-            if not sub_result.data:
-                # Rollback: Revert user profile to original state
-                if original_state:
-                    self.supabase.table('user_profiles').update(original_state).eq('id', user_id).execute()
-                raise RuntimeError(f"Failed to create subscription record for {subscription_id}")
-            
-            return f"Subscription activated for user {user_id}: {tier} (subscription_id: {subscription_id})"
+        if not result.data:
+            raise UnrecoverableError(f"Failed to update user_profiles for user {user_id}")
         
-        except Exception as e:
-            # Compensating transaction: Rollback profile update
-            if original_state:
-                print(f"   🔄 Rolling back user profile update for {user_id}")
-                try:
-                    self.supabase.table('user_profiles').update(original_state).eq('id', user_id).execute()
-                except Exception as rollback_error:
-                    print(f"   ⚠️  Rollback failed: {rollback_error}")
-            raise
+        return f"Subscription activated for user {user_id}: {tier} (subscription_id: {subscription_id})"
     
     def _handle_subscription_updated(self, payload: Dict[str, Any]) -> str:
         """Handle customer.subscription.updated event"""
         subscription = payload['data']['object']
-        user_id = subscription['metadata'].get('userId')
-        tier = subscription['metadata'].get('tier')
+        metadata = subscription.get('metadata') or {}
+        user_id = metadata.get('userId')
+        tier = metadata.get('tier')
         
         if not user_id or not tier:
             return f"Subscription updated but missing metadata (userId={user_id}, tier={tier})"
         
-        current_period_start = datetime.fromtimestamp(subscription['current_period_start']).isoformat()
-        current_period_end = datetime.fromtimestamp(subscription['current_period_end']).isoformat()
+        status = subscription['status']
+        subscription_id = subscription['id']
+        
+        # The event carries the current subscription; keep it for checkouts
+        self._cache_subscription(subscription_id, subscription)
+        current_period_start = _ts_iso(int(subscription['current_period_start']))
+        current_period_end = _ts_iso(int(subscription['current_period_end']))
         
         # Update subscription status (with retry)
         result = self._execute_with_retry(
             lambda: self.supabase.table('subscriptions').update({
-                'status': 'active' if subscription['status'] == 'active' else 'canceled',
+                'status': 'active' if status == 'active' else 'canceled',
                 'current_period_start': current_period_start,
                 'current_period_end': current_period_end,
-            }).eq('stripe_subscription_id', subscription['id']).execute(),
-            operation_name="Update subscription"
+            }, returning='minimal').eq('stripe_subscription_id', subscription_id).execute(),
+            operation_name="Update subscription",
+            breaker=_supabase_breaker
         )
         
-        return f"Subscription updated for user {user_id}: {subscription['status']}"
+        return f"Subscription updated for user {user_id}: {status}"
     
     def _handle_subscription_deleted(self, payload: Dict[str, Any]) -> str:
         """
         Handle customer.subscription.deleted event
         
-        Uses compensating transactions pattern for atomicity
+        The cancellation and profile downgrade run in one transaction via
+        the cancel_subscription() RPC.
         """
         subscription = payload['data']['object']
-        user_id = subscription['metadata'].get('userId')
+        user_id = (subscription.get('metadata') or {}).get('userId')
+        
+        self._forget_subscription(subscription['id'])
         
         if not user_id:
             return f"Subscription deleted but missing userId in metadata"
         
-        # Get original state for rollback
-        original_profile = self.supabase.table('user_profiles').select('subscription_tier, is_premium').eq('id', user_id).execute()
-        original_state = original_profile.data[0] if original_profile.data else None
+        # Cancel subscription and downgrade profile (with retry)
+        result = self._execute_with_retry(
+            lambda: self.supabase.rpc('cancel_subscription', {
+                'p_user_id': user_id,
+                'p_subscription_id': subscription['id'],
+            }).execute(),
+            operation_name="Cancel subscription",
+            breaker=_supabase_breaker
+        )
+        
+        if not result.data:
+            raise UnrecoverableError(f"Failed to update user profile for {user_id}")
         
-        try:
-            # Step 1: Update subscription status (with retry)
-            sub_result = self._execute_with_retry(
-                lambda: self.supabase.table('subscriptions').update({
-                    'status': 'canceled'
-                }).eq('stripe_subscription_id', subscription['id']).execute(),
-                operation_name="Cancel subscription"
-            )
-            
-            # Step 2: Update user profile (with retry)
-            profile_result = self._execute_with_retry(
-                lambda: self.supabase.table('user_profiles').update({
-                    'subscription_tier': None,
-                    'is_premium': False,
-                }).eq('id', user_id).execute(),
-                operation_name="Update user profile (cancel)"
-            )
-            
-            if not profile_result.data:
-                # Rollback: Revert subscription status
-                self.supabase.table('subscriptions').update({
-                    'status': 'active'
-                }).eq('stripe_subscription_id', subscription['id']).execute()
-                raise RuntimeError(f"Failed to update user profile for {user_id}")
+        return f"Subscription canceled for user {user_id}"
+    
+    def _dead_letter(self, funcname: str, task_input: Any, error: Exception) -> bool:
+        """
+        Record a task that cannot succeed in dlq_stripe_events
+        
+        Args:
+            funcname: Colony task function that failed
+            task_input: Decoded payload or raw JSON argument
+            error: Exception raised by the task
             
-            return f"Subscription canceled for user {user_id}"
+        Returns:
+            True if the DLQ row was written
+        """
+        payload = task_input
+        if isinstance(payload, (str, bytes)):
+            try:
+                payload = json_loads(payload)
+            except ValueError:
+                payload = {'raw': payload if isinstance(payload, str) else payload.decode(errors='replace')}
         
-        except Exception as e:
-            # Compensating transaction: Rollback if needed
-            if original_state:
-                print(f"   🔄 Rolling back subscription cancellation for {user_id}")
-                try:
-                    self.supabase.table('user_profiles').update(original_state).eq('id', user_id).execute()
-                except Exception as rollback_error:
-                    print(f"   ⚠️  Rollback failed: {rollback_error}")
-            raise
+        try:
+            self.supabase.table('dlq_stripe_events').insert({
+                'event_id': payload.get('id') if isinstance(payload, dict) else None,
+                'funcname': funcname,
+                'payload': payload,
+                'error': str(error),
+            }, returning='minimal').execute()
+        except Exception as dlq_error:
+            logger.error("   ⚠️  Failed to write DLQ entry: %s", dlq_error)
+            return False
+        return True
     
-    def start(self):
-        """Main event loop - polls for tasks and executes them"""
-        print(f"🐝 {self.executorname} is buzzing. Waiting for jobs...")
-        print(f"   Colony: {self.colonyname}")
-        print(f"   Server: {self.config.colonies_server_host}")
-        print(f"   Poll timeout: {self.config.poll_timeout}s")
-        print("")
+    def _run_process(self, process):
+        """
+        Validate and execute one assigned process on a worker thread
         
-        while True:
-            try:
-                # Long polling - blocks for poll_timeout seconds waiting for a job
-                process = self.colonies.assign(
-                    self.colonyname,
-                    self.config.poll_timeout,
+        Args:
+            process: Process assigned by the Colony Server
+        """
+        try:
+            # Guardian validation (also decodes the payload once for the task)
+            is_safe, reason, payload = self.guardian.validate_and_parse(
+                process.spec.funcname,
+                process.spec.args
+            )
+            
+            if not is_safe:
+                error_msg = f"Guardian blocked task: {reason}"
+                logger.warning("🛡️  %s", error_msg)
+                
+                # Report failure to Colony Server
+                self.colonies.fail(
+                    process.processid,
+                    [error_msg],
                     self.executor_prvkey
                 )
+                return
+            
+            # Execute task based on function name
+            task = self._tasks.get(process.spec.funcname)
+            if task is None:
+                error_msg = f"Unknown function: {process.spec.funcname}"
+                logger.error("❌ %s", error_msg)
                 
-                print(f"⚡ Process {process.processid} assigned")
-                print(f"   Function: {process.spec.funcname}")
-                print(f"   Priority: {process.spec.priority}")
-                print(f"   Args: {len(process.spec.args)} argument(s)")
-                
-                # Guardian validation
-                is_safe, reason = self.guardian.validate_task(
-                    process.spec.funcname,
-                    process.spec.args
+                self.colonies.fail(
+                    process.processid,
+                    [error_msg],
+                    self.executor_prvkey
                 )
-                
-                if not is_safe:
-                    error_msg = f"Guardian blocked task: {reason}"
-                    print(f"🛡️  {error_msg}")
-                    
-                    # Report failure to Colony Server
-                    self.colonies.fail(
-                        process.processid,
-                        [error_msg],
-                        self.executor_prvkey
+                return
+            
+            task_input = payload if payload is not None else process.spec.args[0]
+            try:
+                result = task(task_input)
+            except Exception as e:
+                if _is_circuit_open(e):
+                    # No call was made and the service may already be back;
+                    # never park these (the DLQ write would hit the same outage)
+                    logger.warning(
+                        "⚠️  Process %s refused by open circuit, leaving it for re-dispatch: %s",
+                        process.processid, e
                     )
-                    continue
+                    return
                 
-                # Execute task based on function name
-                if process.spec.funcname == "validate_revenue":
-                    result = self.validate_revenue(process.spec.args[0])
-                    
-                    # Report success to Colony Server
-                    self.colonies.close(
-                        process.processid,
-                        [result],
-                        self.executor_prvkey
+                attempt = process.retries + 1
+                if not _is_unrecoverable(e) and attempt < _DLQ_AFTER_ATTEMPTS:
+                    # Transient failure: leave the process open so Colony
+                    # re-dispatches it once its maxexectime runs out
+                    logger.warning(
+                        "⚠️  Process %s failed (attempt %d/%d), leaving it for re-dispatch: %s",
+                        process.processid, attempt, _DLQ_AFTER_ATTEMPTS, e
                     )
-                    
-                    print(f"✅ Process {process.processid} completed successfully")
-                    print(f"   Result: {result}")
+                    return
                 
-                else:
-                    error_msg = f"Unknown function: {process.spec.funcname}"
-                    print(f"❌ {error_msg}")
-                    
-                    self.colonies.fail(
-                        process.processid,
-                        [error_msg],
+                # Park it and stop Colony re-dispatching it, but only once
+                # the payload is safely stored
+                if not self._dead_letter(process.spec.funcname, task_input, e):
+                    logger.error("❌ Process %s failed and could not be parked, leaving it for re-dispatch: %s", process.processid, e)
+                    return
+                
+                error_msg = f"Moved to DLQ: {e}"
+                logger.error("❌ Process %s failed: %s", process.processid, error_msg)
+                self.colonies.fail(
+                    process.processid,
+                    [error_msg],
+                    self.executor_prvkey
+                )
+                return
+            
+            # Report success to Colony Server
+            self.colonies.close(
+                process.processid,
+                [result],
+                self.executor_prvkey
+            )
+            
+            logger.info("✅ Process %s completed successfully", process.processid)
+            logger.debug("   Result: %s", result)
+        
+        except Exception as e:
+            logger.warning("⚠️  Process %s failed: %s", process.processid, e)
+        
+        finally:
+            self._slots.release()
+    
+    def start(self):
+        """Main event loop - polls for tasks and hands them to worker threads"""
+        logger.info("🐝 %s is buzzing. Waiting for jobs...", self.executorname)
+        logger.info("   Colony: %s", self.colonyname)
+        logger.info("   Server: %s", self.config.colonies_server_host)
+        logger.info("   Poll timeout: %ss", self.config.poll_timeout)
+        logger.info("   Max concurrency: %s", self.config.max_concurrency)
+        
+        signal.signal(signal.SIGTERM, _on_sigterm)
+        
+        with ThreadPoolExecutor(
+            max_workers=self.config.max_concurrency,
+            thread_name_prefix=self.executorname
+        ) as pool:
+            try:
+                self._poll(pool)
+            except KeyboardInterrupt:
+                # A repeated stop signal must not cut the drain short
+                signal.signal(signal.SIGTERM, signal.SIG_IGN)
+                logger.info("🛑 Shutting down Finance Bee (finishing in-flight processes)...")
+                pool.shutdown(wait=True)
+                logger.info("   Guardian stats: %s", self.guardian.get_stats())
+                logger.info("   Retry budget: %s", _retry_budget.get_stats())
+                logger.info("   Supabase circuit: %s", _supabase_breaker.get_stats())
+                logger.info("   Stripe circuit: %s", _stripe_breaker.get_stats())
+                sys.exit(0)
+    
+    def _poll(self, pool: ThreadPoolExecutor):
+        """
+        Assign processes and submit them to the worker pool until interrupted
+        
+        Args:
+            pool: Worker pool that runs _run_process
+            
+        Raises:
+            KeyboardInterrupt: On Ctrl+C or SIGTERM
+        """
+        backoff = 1.0
+        while True:
+            try:
+                # Backpressure - only take a job when a worker slot is free
+                self._slots.acquire()
+                try:
+                    # Long polling - blocks for poll_timeout seconds waiting for a job
+                    process = self.colonies.assign(
+                        self.colonyname,
+                        self.config.poll_timeout,
                         self.executor_prvkey
                     )
+                except BaseException:
+                    self._slots.release()
+                    raise
                 
-                print("")
+                backoff = 1.0
+                logger.info("⚡ Process %s assigned", process.processid)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("   Function: %s", process.spec.funcname)
+                    logger.debug("   Priority: %s", process.spec.priority)
+                    logger.debug("   Args: %d argument(s)", len(process.spec.args))
                 
-            except KeyboardInterrupt:
-                print("\n🛑 Shutting down Finance Bee...")
-                print(f"   Guardian stats: {self.guardian.get_stats()}")
-                sys.exit(0)
+                # The worker releases the slot when the process is done
+                pool.submit(self._run_process, process)
             
             except Exception as e:
                 # "No processes found" is normal during polling
                 # Other exceptions should be logged but not crash the bee
                 error_str = str(e)
-                if "no processes" not in error_str.lower():
-                    print(f"⚠️  Error in event loop: {error_str}")
-                    time.sleep(1)  # Brief pause before retrying
-
+                if "no processes" in error_str.lower():
+                    backoff = 1.0
+                else:
+                    # Back off exponentially while the server is unreachable
+                    logger.warning("⚠️  Error in event loop: %s (retrying in %.0fs)", error_str, backoff)
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, _LOOP_BACKOFF_MAX)
 
 if __name__ == '__main__':
+    # BEE_LOG=DEBUG restores per-process detail (function, args, results)
+    log_level_name = os.environ.get('BEE_LOG', 'INFO').upper()
+    log_level = logging.getLevelName(log_level_name)
+    logging.basicConfig(level=log_level if isinstance(log_level, int) else logging.INFO, format='%(message)s')
+    if not isinstance(log_level, int):
+        logger.warning("⚠️  Unknown BEE_LOG level %r, using INFO", log_level_name)
+    
     print("=" * 60)
     print("🐝 Zyeute Finance Bee")
     print("=" * 60)
@@ -453,6 +849,9 @@ if __name__ == '__main__':
     try:
         bee = FinanceBee()
         bee.start()
+    except BeeInitError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"❌ Fatal error: {e}")
         traceback.print_exc()
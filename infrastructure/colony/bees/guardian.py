@@ -5,14 +5,25 @@ Provides content-level safety checks for task payloads.
 Complements Colony OS's transport-level security (cryptographic signatures).
 """
 
+import hashlib
 import json
 import re
-from typing import Dict, Any, Tuple
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Fast JSON parser for task payloads (optional)
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 
 class Guardian:
     """Content safety validator for Worker Bee tasks"""
     
+    __slots__ = ('blocked_count', 'approved_count', '_cache', '_cache_lock')
+    
     # Dangerous patterns to block
     DANGEROUS_PATTERNS = [
         r'rm\s+-rf',
@@ -26,6 +37,13 @@ class Guardian:
         r'>\s*/dev/sd',
     ]
     
+    # All dangerous patterns in one case-insensitive scan; group pN maps
+    # back to DANGEROUS_PATTERNS[N] for the block reason
+    _DANGEROUS_RE = re.compile(
+        '|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(DANGEROUS_PATTERNS)),
+        re.IGNORECASE
+    )
+    
     # Required fields for different task types
     REQUIRED_FIELDS = {
         'validate_revenue': ['type', 'data'],
@@ -33,9 +51,24 @@ class Guardian:
         'analyze_security': ['user_id', 'event_type'],
     }
     
+    # Required data.object fields per Stripe event type: (key path, reason)
+    REQUIRED_STRIPE_FIELDS = {
+        'checkout.session.completed': (
+            (('metadata',), "Missing session metadata"),
+            (('metadata', 'userId'), "Missing userId in metadata"),
+            (('metadata', 'tier'), "Missing tier in metadata"),
+            (('subscription',), "Missing subscription ID"),
+        ),
+    }
+    
+    # Number of recent task verdicts remembered for replayed tasks
+    CACHE_SIZE = 4096
+    
     def __init__(self):
         self.blocked_count = 0
         self.approved_count = 0
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def validate_task(self, funcname: str, args: list) -> Tuple[bool, str]:
         """
@@ -48,34 +81,97 @@ class Guardian:
         Returns:
             Tuple of (is_safe, reason)
         """
+        is_safe, reason, _ = self.validate_and_parse(funcname, args)
+        return is_safe, reason
+    
+    def validate_and_parse(self, funcname: str, args: list) -> Tuple[bool, str, Optional[Any]]:
+        """
+        Validate task safety, returning the decoded payload for reuse
+        
+        Verdicts are remembered per (funcname, args digest), so a task that
+        is replayed (Stripe retries, Colony re-dispatch) skips the regex scan
+        and field checks. Only (is_safe, reason) is cached; an approved
+        payload is decoded again on a hit so the cache stays small.
+        
+        Args:
+            funcname: Function name to execute
+            args: Function arguments
+            
+        Returns:
+            Tuple of (is_safe, reason, payload). payload is the decoded first
+            argument for task types with required fields, otherwise None.
+        """
+        key = self._cache_key(funcname, args)
+        verdict = None
+        
+        if key is not None:
+            with self._cache_lock:
+                verdict = self._cache.get(key)
+                if verdict is not None:
+                    self._cache.move_to_end(key)
+        
+        if verdict is None:
+            result = self._check_task(funcname, args)
+            if key is not None:
+                with self._cache_lock:
+                    self._cache[key] = result[:2]
+                    if len(self._cache) > self.CACHE_SIZE:
+                        self._cache.popitem(last=False)
+        elif verdict[0] and funcname in self.REQUIRED_FIELDS:
+            # Cached approval: the payload already decoded cleanly once
+            result = (*verdict, json_loads(args[0]))
+        else:
+            result = (*verdict, None)
+        
+        # Worker threads share one Guardian; += is not atomic
+        with self._cache_lock:
+            if result[0]:
+                self.approved_count += 1
+            else:
+                self.blocked_count += 1
+        return result
+    
+    @staticmethod
+    def _cache_key(funcname: str, args: list) -> Optional[Tuple[str, bytes]]:
+        """Cache key for str/bytes argument lists, otherwise None"""
+        if not args or not all(isinstance(arg, (str, bytes)) for arg in args):
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        for arg in args:
+            # Raw webhook bodies arrive as bytes; hash them without decoding
+            digest.update(arg if isinstance(arg, bytes) else arg.encode())
+            digest.update(b'\x00')
+        return funcname, digest.digest()
+    
+    def _check_task(self, funcname: str, args: list) -> Tuple[bool, str, Optional[Any]]:
+        """Run the task checks behind validate_and_parse (uncached, uncounted)"""
         # Check for dangerous patterns in command
         if funcname in ['execute_command', 'run_script']:
             command = ' '.join(args)
-            for pattern in self.DANGEROUS_PATTERNS:
-                if re.search(pattern, command, re.IGNORECASE):
-                    self.blocked_count += 1
-                    return False, f"Blocked dangerous pattern: {pattern}"
+            match = self._DANGEROUS_RE.search(command)
+            if match:
+                pattern = self.DANGEROUS_PATTERNS[int(match.lastgroup[1:])]
+                return False, f"Blocked dangerous pattern: {pattern}", None
+        
+        payload = None
         
         # Validate required fields for specific task types
         if funcname in self.REQUIRED_FIELDS:
             if not args or len(args) == 0:
-                self.blocked_count += 1
-                return False, f"Missing required arguments for {funcname}"
+                return False, f"Missing required arguments for {funcname}", None
             
             try:
-                payload = json.loads(args[0]) if isinstance(args[0], str) else args[0]
-                required = self.REQUIRED_FIELDS[funcname]
+                payload = json_loads(args[0]) if isinstance(args[0], (str, bytes)) else args[0]
+                if not isinstance(payload, dict):
+                    return False, f"Invalid payload format: expected object, got {type(payload).__name__}", None
                 
-                for field in required:
+                for field in self.REQUIRED_FIELDS[funcname]:
                     if field not in payload:
-                        self.blocked_count += 1
-                        return False, f"Missing required field: {field}"
+                        return False, f"Missing required field: {field}", None
             except (json.JSONDecodeError, TypeError) as e:
-                self.blocked_count += 1
-                return False, f"Invalid payload format: {str(e)}"
+                return False, f"Invalid payload format: {str(e)}", None
         
-        self.approved_count += 1
-        return True, "Task approved"
+        return True, "Task approved", payload
     
     def validate_stripe_payload(self, payload: Dict[str, Any]) -> Tuple[bool, str]:
         """
@@ -94,23 +190,17 @@ class Guardian:
         if 'data' not in payload or 'object' not in payload['data']:
             return False, "Missing event data"
         
-        event_type = payload['type']
+        required = self.REQUIRED_STRIPE_FIELDS.get(payload['type'])
+        if required is None:
+            return True, "Stripe payload valid"
         
-        # Validate checkout.session.completed
-        if event_type == 'checkout.session.completed':
-            session = payload['data']['object']
-            
-            if 'metadata' not in session:
-                return False, "Missing session metadata"
-            
-            if 'userId' not in session['metadata']:
-                return False, "Missing userId in metadata"
-            
-            if 'tier' not in session['metadata']:
-                return False, "Missing tier in metadata"
-            
-            if 'subscription' not in session:
-                return False, "Missing subscription ID"
+        obj = payload['data']['object']
+        for path, reason in required:
+            node = obj
+            for key in path:
+                if not isinstance(node, dict) or key not in node:
+                    return False, reason
+                node = node[key]
         
         return True, "Stripe payload valid"
     
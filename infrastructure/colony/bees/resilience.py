@@ -0,0 +1,129 @@
+"""
+Resilience helpers for Colony OS Worker Bees
+
+Guards shared by every call a bee makes to an external service
+(Stripe, Supabase), so transient failures are retried without turning
+an outage into a retry storm.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+
+class RetryBudget:
+    """Token bucket capping how many retries a bee may issue"""
+
+    def __init__(self, capacity: int = 10, refill_per_second: float = 0.5):
+        """
+        Args:
+            capacity: Maximum retries that can be issued in a burst
+            refill_per_second: Retry tokens regained per second
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.granted_count = 0
+        self.denied_count = 0
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """
+        Take one retry token
+
+        Returns:
+            True if the retry may proceed, False if the budget is exhausted
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated_at
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+            self._updated_at = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.granted_count += 1
+                return True
+
+            self.denied_count += 1
+            return False
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get retry budget statistics"""
+        return {
+            'granted': self.granted_count,
+            'denied': self.denied_count,
+        }
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is refused because its circuit is open"""
+
+
+class CircuitBreaker:
+    """Fail fast against an external service after repeated failures"""
+
+    def __init__(self, name: str, fail_max: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            name: Service name used in errors and stats
+            fail_max: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before letting calls through again
+        """
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failure_count = 0
+        self.opened_count = 0
+        self.rejected_count = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def _is_open(self, now: float) -> bool:
+        return self._opened_at is not None and now - self._opened_at < self.reset_timeout
+
+    def before_call(self):
+        """
+        Check the circuit before calling the service
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        with self._lock:
+            if self._is_open(time.monotonic()):
+                self.rejected_count += 1
+                raise CircuitOpenError(f"{self.name} circuit open, failing fast")
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.failure_count = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """Count a failed call, opening the circuit at fail_max"""
+        with self._lock:
+            now = time.monotonic()
+            self.failure_count += 1
+            if self.failure_count >= self.fail_max:
+                # A failure while half-open (timeout elapsed) re-opens it
+                if not self._is_open(now):
+                    self.opened_count += 1
+                self._opened_at = now
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open', or 'half-open' (timeout elapsed, awaiting a result)"""
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'open' if self._is_open(time.monotonic()) else 'half-open'
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get circuit breaker statistics"""
+        return {
+            'state': self.state,
+            'opened': self.opened_count,
+            'rejected': self.rejected_count,
+        }
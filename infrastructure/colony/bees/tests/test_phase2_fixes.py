@@ -1,111 +1,158 @@
 """
 Tests for Phase 2.1 Critical Fixes
 
-Tests compensating transactions, retry logic, and error handling
+Tests transactional subscription writes, retry logic, and error handling
 """
 
 import unittest
 import sys
 import os
+import json
+from collections import OrderedDict
 from unittest.mock import Mock, patch, MagicMock
+import threading
 import time
 
-# Add parent directory to path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Add parent directory to path (once, so repeated imports don't grow sys.path)
+BEES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BEES_DIR not in sys.path:
+    sys.path.insert(0, BEES_DIR)
 
 
-class TestCompensatingTransactions(unittest.TestCase):
-    """Test compensating transactions for race condition fixes"""
+def _make_supabase_mock(exists=False, activated=True):
+    """
+    Build a Supabase client mock wired for the checkout path
+    
+    Args:
+        exists: Whether the subscriptions idempotency probe finds a row
+        activated: Value returned by the activate_subscription RPC
+    
+    Returns:
+        MagicMock standing in for the Supabase client
+    """
+    supabase = MagicMock()
+    probe = supabase.table.return_value.select.return_value.eq.return_value.limit.return_value
+    probe.execute.return_value.data = [{'id': 'existing-sub'}] if exists else []
+    supabase.rpc.return_value.execute.return_value.data = activated
+    return supabase
+
+
+class TestSubscriptionActivation(unittest.TestCase):
+    """Test checkout activation through the activate_subscription() RPC"""
     
-    @patch('finance_bee.create_client')
     @patch('finance_bee.stripe')
-    def test_idempotency_check(self, mock_stripe, mock_supabase):
+    def test_idempotency_check(self, mock_stripe):
         """Test that duplicate webhooks are handled idempotently"""
-        # Mock existing subscription
-        mock_supabase_instance = Mock()
-        mock_table = Mock()
-        mock_select = Mock()
-        mock_execute = Mock()
-        mock_execute.data = [{'id': 'existing-sub'}]  # Subscription exists
-        
-        mock_select.execute.return_value = mock_execute
-        mock_table.select.return_value = mock_select
-        mock_table.eq.return_value = mock_select
-        mock_supabase_instance.table.return_value = mock_table
-        
-        # Test should detect existing subscription and skip processing
-        self.assertTrue(True)  # Placeholder - actual test requires full Finance Bee mock
-    
-    @patch('finance_bee.create_client')
-    def test_rollback_on_profile_update_failure(self, mock_supabase):
-        """Test rollback when profile update fails"""
-        # Mock Supabase to fail on profile update
-        mock_supabase_instance = Mock()
-        mock_table = Mock()
-        
-        # First call (get original state) succeeds
-        mock_execute_get = Mock()
-        mock_execute_get.data = [{'subscription_tier': 'bronze', 'is_premium': True}]
-        
-        # Second call (update) fails
-        mock_execute_update = Mock()
-        mock_execute_update.data = None  # Failure
-        
-        # Test should rollback to original state
-        self.assertTrue(True)  # Placeholder
-    
-    @patch('finance_bee.create_client')
-    def test_rollback_on_subscription_upsert_failure(self, mock_supabase):
-        """Test rollback when subscription upsert fails"""
-        # Test should revert user_profiles update
-        self.assertTrue(True)  # Placeholder
+        from finance_bee import FinanceBee
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.supabase = _make_supabase_mock(exists=True)
+        
+        payload = {
+            'type': 'checkout.session.completed',
+            'data': {
+                'object': {
+                    'metadata': {'userId': 'user123', 'tier': 'bronze'},
+                    'subscription': 'sub_123'
+                }
+            }
+        }
+        
+        result = bee._handle_checkout_completed(payload)
+        
+        # Existing subscription detected, processing skipped
+        self.assertIn('idempotent', result)
+        bee.supabase.rpc.assert_not_called()
+        mock_stripe.Subscription.retrieve.assert_not_called()
 
 
 class TestRetryLogic(unittest.TestCase):
     """Test exponential backoff retry logic"""
     
-    def test_retry_with_exponential_backoff(self):
-        """Test retry delays follow exponential backoff pattern"""
+    @patch('finance_bee._retry_budget')
+    @patch('finance_bee.time.sleep')
+    def test_retry_with_exponential_backoff(self, mock_sleep, mock_budget):
+        """Test retry delays stay within the doubling backoff steps"""
         from finance_bee import FinanceBee
         
-        # Mock function that fails twice then succeeds
-        call_count = [0]
-        def flaky_function():
-            call_count[0] += 1
-            if call_count[0] < 3:
-                raise Exception("Temporary failure")
-            return "success"
+        mock_budget.try_acquire.return_value = True
+        bee = FinanceBee.__new__(FinanceBee)
+        flaky = Mock(side_effect=[Exception("Temporary failure")] * 4 + ["success"])
         
-        # Test would verify:
-        # - Attempt 1: immediate
-        # - Attempt 2: 1s delay
-        # - Attempt 3: 2s delay
-        # - Result: success
-        self.assertTrue(True)  # Placeholder
+        result = bee._execute_with_retry(flaky, max_retries=5, base_delay=1)
+        
+        self.assertEqual(result, "success")
+        delays = [c[0][0] for c in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 4)
+        for attempt, delay in enumerate(delays):
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, 2 ** attempt)
+    
+    @patch('finance_bee._retry_budget')
+    @patch('finance_bee.time.sleep')
+    def test_retry_delay_is_capped(self, mock_sleep, mock_budget):
+        """Test no backoff step exceeds max_delay"""
+        from finance_bee import FinanceBee
+        
+        mock_budget.try_acquire.return_value = True
+        bee = FinanceBee.__new__(FinanceBee)
+        flaky = Mock(side_effect=[Exception("Temporary failure")] * 9 + ["success"])
+        
+        bee._execute_with_retry(flaky, max_retries=10, base_delay=1, max_delay=5)
+        
+        self.assertTrue(all(c[0][0] <= 5 for c in mock_sleep.call_args_list))
     
-    def test_non_retryable_errors(self):
+    @patch('finance_bee.time.sleep')
+    @patch('finance_bee.random.uniform', return_value=0)
+    def test_retry_delay_has_full_jitter(self, mock_uniform, mock_sleep):
+        """Test retry delays are drawn between zero and the backoff step"""
+        from finance_bee import FinanceBee
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        flaky = Mock(side_effect=[Exception("Temporary failure"), Exception("Temporary failure"), "success"])
+        
+        result = bee._execute_with_retry(flaky, max_retries=3, base_delay=1)
+        
+        self.assertEqual(result, "success")
+        mock_uniform.assert_any_call(0, 1)
+        mock_uniform.assert_any_call(0, 2)
+        self.assertEqual(mock_sleep.call_count, 2)
+    
+    @patch('finance_bee.time.sleep')
+    def test_non_retryable_errors(self, mock_sleep):
         """Test that non-retryable errors fail immediately"""
-        # Errors containing 'invalid', 'not found', 'unauthorized', 'forbidden'
-        # should not be retried
+        from finance_bee import FinanceBee
         
-        def invalid_function():
-            raise Exception("Invalid user_id")
+        bee = FinanceBee.__new__(FinanceBee)
+        invalid = Mock(side_effect=Exception("Invalid user_id"))
         
-        # Should fail immediately without retries
-        self.assertTrue(True)  # Placeholder
+        with self.assertRaises(Exception):
+            bee._execute_with_retry(invalid, max_retries=3)
+        
+        invalid.assert_called_once()
+        mock_sleep.assert_not_called()
     
-    def test_max_retries_exhausted(self):
+    @patch('finance_bee._retry_budget')
+    @patch('finance_bee.time.sleep')
+    def test_max_retries_exhausted(self, mock_sleep, mock_budget):
         """Test that function fails after max retries"""
-        def always_fails():
-            raise Exception("Persistent failure")
+        from finance_bee import FinanceBee
         
-        # Should fail after 3 attempts
-        self.assertTrue(True)  # Placeholder
+        mock_budget.try_acquire.return_value = True
+        bee = FinanceBee.__new__(FinanceBee)
+        always_fails = Mock(side_effect=Exception("Persistent failure"))
+        
+        with self.assertRaises(Exception):
+            bee._execute_with_retry(always_fails, max_retries=3)
+        
+        self.assertEqual(always_fails.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
 
 
 class TestTimeoutHandling(unittest.TestCase):
     """Test timeout handling in Colony OS client"""
     
+    @unittest.skip('TODO: implement')
     def test_timeout_triggers_abort(self):
         """Test that timeout triggers AbortController"""
         # Mock slow Colony Server response
@@ -113,6 +160,7 @@ class TestTimeoutHandling(unittest.TestCase):
         # Verify timeout is cleared
         self.assertTrue(True)  # Placeholder
     
+    @unittest.skip('TODO: implement')
     def test_successful_request_clears_timeout(self):
         """Test that successful requests clear timeout"""
         # Mock fast Colony Server response
@@ -120,6 +168,7 @@ class TestTimeoutHandling(unittest.TestCase):
         # Verify no AbortError
         self.assertTrue(True)  # Placeholder
     
+    @unittest.skip('TODO: implement')
     def test_timeout_error_message(self):
         """Test timeout error message is helpful"""
         # Verify error message includes timeout duration
@@ -130,6 +179,7 @@ class TestTimeoutHandling(unittest.TestCase):
 class TestErrorRecovery(unittest.TestCase):
     """Test error recovery patterns"""
     
+    @unittest.skip('TODO: implement')
     def test_supabase_connection_failure_recovery(self):
         """Test recovery from Supabase connection failure"""
         # Mock Supabase connection failure
@@ -137,30 +187,168 @@ class TestErrorRecovery(unittest.TestCase):
         # Verify eventual success
         self.assertTrue(True)  # Placeholder
     
+    @unittest.skip('TODO: implement')
     def test_stripe_api_failure_recovery(self):
         """Test recovery from Stripe API failure"""
         # Mock Stripe API failure
         # Verify retry logic kicks in
         # Verify eventual success
         self.assertTrue(True)  # Placeholder
+
+
+class TestDeadLetterQueue(unittest.TestCase):
+    """Test failed tasks are parked instead of re-dispatched"""
     
-    def test_partial_update_recovery(self):
-        """Test recovery from partial database updates"""
-        # Mock failure after first update
-        # Verify rollback occurs
-        # Verify state is consistent
-        self.assertTrue(True)  # Placeholder
+    def _bee(self, error):
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.supabase = MagicMock()
+        bee.colonies = Mock()
+        bee.executor_prvkey = 'prvkey'
+        bee._slots = threading.BoundedSemaphore(1)
+        bee._slots.acquire()
+        bee._tasks = {'validate_revenue': Mock(side_effect=error)}
+        return bee
+    
+    def _process(self, retries=0):
+        process = Mock()
+        process.processid = 'proc-1'
+        process.retries = retries
+        process.spec.funcname = 'validate_revenue'
+        process.spec.args = [json.dumps({'id': 'evt_1', 'type': 'checkout.session.completed', 'data': {}})]
+        return process
+    
+    def test_failed_task_moves_to_dlq(self):
+        """Test a task still failing on its last attempt is written to the DLQ and failed in Colony"""
+        bee = self._bee(RuntimeError("Processing failed: boom"))
+        
+        bee._run_process(self._process(retries=2))
+        
+        bee.supabase.table.assert_called_with('dlq_stripe_events')
+        row = bee.supabase.table.return_value.insert.call_args[0][0]
+        self.assertEqual(row['event_id'], 'evt_1')
+        bee.colonies.fail.assert_called_once()
+        bee.colonies.close.assert_not_called()
+    
+    def test_transient_failure_left_for_redispatch(self):
+        """Test an early transient failure is neither parked nor failed"""
+        bee = self._bee(RuntimeError("Processing failed: connection reset"))
+        
+        bee._run_process(self._process(retries=0))
+        
+        bee.supabase.table.assert_not_called()
+        bee.colonies.fail.assert_not_called()
+        bee.colonies.close.assert_not_called()
+    
+    def test_unrecoverable_failure_parked_immediately(self):
+        """Test a failure no retry can fix goes to the DLQ on the first attempt"""
+        from finance_bee import UnrecoverableError
+        
+        error = RuntimeError("Processing failed: missing profile")
+        error.__cause__ = UnrecoverableError("missing profile")
+        bee = self._bee(error)
+        
+        bee._run_process(self._process(retries=0))
+        
+        bee.supabase.table.assert_called_with('dlq_stripe_events')
+        bee.colonies.fail.assert_called_once()
+    
+    def test_open_circuit_never_parked(self):
+        """Test a call refused by an open circuit is left for re-dispatch, even on the last attempt"""
+        from resilience import CircuitOpenError
+        
+        error = RuntimeError("Processing failed: supabase circuit open, failing fast")
+        error.__cause__ = CircuitOpenError("supabase circuit open, failing fast")
+        bee = self._bee(error)
+        
+        bee._run_process(self._process(retries=5))
+        
+        bee.supabase.table.assert_not_called()
+        bee.colonies.fail.assert_not_called()
+        bee.colonies.close.assert_not_called()
+    
+    def test_failed_dlq_write_leaves_process(self):
+        """Test the process is not failed when its DLQ row could not be written"""
+        bee = self._bee(RuntimeError("Processing failed: boom"))
+        bee.supabase.table.return_value.insert.return_value.execute.side_effect = RuntimeError("Supabase down")
+        
+        bee._run_process(self._process(retries=2))
+        
+        bee.colonies.fail.assert_not_called()
+        bee.colonies.close.assert_not_called()
+    
+    def test_unhandled_event_closed_after_guardian(self):
+        """Test an unhandled event type is validated, then closed with no action"""
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.colonies = Mock()
+        bee.supabase = MagicMock()
+        bee.executor_prvkey = 'prvkey'
+        bee._slots = threading.BoundedSemaphore(1)
+        bee._slots.acquire()
+        bee._handlers = {}
+        bee._tasks = {'validate_revenue': bee.validate_revenue}
+        
+        process = Mock()
+        process.processid = 'proc-2'
+        process.spec.funcname = 'validate_revenue'
+        process.spec.args = [json.dumps({'id': 'evt_2', 'type': 'invoice.paid', 'data': {'object': {}}})]
+        
+        bee._run_process(process)
+        
+        self.assertEqual(bee.guardian.get_stats()['approved'], 1)
+        self.assertIn('no action taken', bee.colonies.close.call_args[0][1][0])
+        bee.supabase.table.assert_not_called()
+    
+    def test_malformed_payload_reaches_guardian(self):
+        """Test payloads without a readable event type are blocked by Guardian"""
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.colonies = Mock()
+        bee.executor_prvkey = 'prvkey'
+        bee._slots = threading.BoundedSemaphore(1)
+        
+        raws = [
+            'not json',
+            '{"type": "invoice.paid", "data": {',
+            '{"data": {}}',
+            # Nested type only: the event itself has no type
+            '{"data": {"object": {"type": "card"}}}',
+        ]
+        for raw in raws:
+            bee._slots.acquire()
+            process = Mock()
+            process.processid = 'proc-3'
+            process.spec.funcname = 'validate_revenue'
+            process.spec.args = [raw]
+            
+            bee._run_process(process)
+        
+        self.assertEqual(bee.colonies.fail.call_count, 4)
+        bee.colonies.close.assert_not_called()
+        self.assertEqual(bee.guardian.get_stats()['blocked'], 4)
 
 
 class TestConcurrentWebhooks(unittest.TestCase):
     """Test handling of concurrent webhooks"""
     
+    @unittest.skip('TODO: implement')
     def test_concurrent_checkout_webhooks(self):
         """Test multiple concurrent checkout.session.completed webhooks"""
         # Test idempotency prevents duplicate processing
         # Verify only one subscription created
         self.assertTrue(True)  # Placeholder
     
+    @unittest.skip('TODO: implement')
     def test_concurrent_update_webhooks(self):
         """Test concurrent subscription.updated webhooks"""
         # Test last-write-wins behavior
@@ -168,9 +356,133 @@ class TestConcurrentWebhooks(unittest.TestCase):
         self.assertTrue(True)  # Placeholder
 
 
+class TestStripeCalls(unittest.TestCase):
+    """Test Stripe API usage on the webhook path"""
+    
+    @patch('finance_bee.stripe')
+    def test_expanded_subscription_skips_retrieve(self, mock_stripe):
+        """Test an expanded subscription in the session avoids a Stripe call"""
+        from finance_bee import FinanceBee
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.supabase = _make_supabase_mock()
+        
+        payload = {
+            'type': 'checkout.session.completed',
+            'data': {
+                'object': {
+                    'metadata': {'userId': 'user123', 'tier': 'bronze'},
+                    'customer': 'cus_123',
+                    'subscription': {
+                        'id': 'sub_123',
+                        'current_period_start': 1760572800,
+                        'current_period_end': 1763251200,
+                    }
+                }
+            }
+        }
+        
+        result = bee._handle_checkout_completed(payload)
+        
+        self.assertIn('sub_123', result)
+        mock_stripe.Subscription.retrieve.assert_not_called()
+        bee.supabase.rpc.assert_called_once()
+        self.assertEqual(bee.supabase.rpc.call_args[0][0], 'activate_subscription')
+    
+    @patch('finance_bee.stripe')
+    def test_partial_expanded_subscription_is_retrieved(self, mock_stripe):
+        """Test an expanded subscription without both period bounds is fetched"""
+        from finance_bee import FinanceBee
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.supabase = _make_supabase_mock()
+        bee._subscription_cache = OrderedDict()
+        bee._subscription_lock = threading.Lock()
+        mock_stripe.Subscription.retrieve.return_value = {
+            'id': 'sub_123',
+            'current_period_start': 1760572800,
+            'current_period_end': 1763251200,
+        }
+        
+        payload = {
+            'type': 'checkout.session.completed',
+            'data': {
+                'object': {
+                    'metadata': {'userId': 'user123', 'tier': 'bronze'},
+                    'subscription': {'id': 'sub_123', 'current_period_end': 1763251200}
+                }
+            }
+        }
+        
+        bee._handle_checkout_completed(payload)
+        
+        mock_stripe.Subscription.retrieve.assert_called_once_with('sub_123')
+    
+    @patch('finance_bee.stripe')
+    def test_missing_profile_fails_activation(self, mock_stripe):
+        """Test activation fails when the RPC reports no profile was updated"""
+        from finance_bee import FinanceBee
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.supabase = _make_supabase_mock(activated=False)
+        
+        payload = {
+            'type': 'checkout.session.completed',
+            'data': {
+                'object': {
+                    'metadata': {'userId': 'user123', 'tier': 'bronze'},
+                    'subscription': {
+                        'id': 'sub_123',
+                        'current_period_start': 1760572800,
+                        'current_period_end': 1763251200,
+                    }
+                }
+            }
+        }
+        
+        with self.assertRaises(RuntimeError):
+            bee._handle_checkout_completed(payload)
+
+
+class TestSubscriptionCache(unittest.TestCase):
+    """Test short-lived Stripe subscription cache"""
+    
+    def _bee(self):
+        from finance_bee import FinanceBee
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee._subscription_cache = OrderedDict()
+        bee._subscription_lock = threading.Lock()
+        return bee
+    
+    @patch('finance_bee.stripe')
+    def test_retrieve_is_cached(self, mock_stripe):
+        """Test a second lookup within the TTL skips the Stripe call"""
+        bee = self._bee()
+        mock_stripe.Subscription.retrieve.return_value = {'id': 'sub_123'}
+        
+        bee._get_subscription('sub_123')
+        bee._get_subscription('sub_123')
+        
+        mock_stripe.Subscription.retrieve.assert_called_once_with('sub_123')
+    
+    @patch('finance_bee.stripe')
+    def test_forget_forces_refetch(self, mock_stripe):
+        """Test a forgotten subscription is fetched again"""
+        bee = self._bee()
+        mock_stripe.Subscription.retrieve.return_value = {'id': 'sub_123'}
+        
+        bee._get_subscription('sub_123')
+        bee._forget_subscription('sub_123')
+        bee._get_subscription('sub_123')
+        
+        self.assertEqual(mock_stripe.Subscription.retrieve.call_count, 2)
+
+
 class TestIdempotency(unittest.TestCase):
     """Test idempotency of webhook processing"""
     
+    @unittest.skip('TODO: implement')
     def test_duplicate_checkout_webhook(self):
         """Test duplicate checkout.session.completed webhook"""
         # First webhook: processes normally
@@ -178,11 +490,134 @@ class TestIdempotency(unittest.TestCase):
         # Verify idempotent message returned
         self.assertTrue(True)  # Placeholder
     
+    @unittest.skip('TODO: implement')
     def test_stripe_subscription_id_uniqueness(self):
         """Test stripe_subscription_id prevents duplicates"""
         # Verify upsert with on_conflict works correctly
         # Verify no duplicate subscriptions created
         self.assertTrue(True)  # Placeholder
+    
+    def test_duplicate_event_id_short_circuits(self):
+        """Test a redelivered Stripe event id skips all handlers"""
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.supabase = MagicMock()
+        bee.supabase.rpc.return_value.execute.return_value.data = 'done'
+        bee._seen_events = OrderedDict()
+        bee._seen_lock = threading.Lock()
+        handler = Mock()
+        bee._handlers = {'checkout.session.completed': handler}
+        
+        payload = {
+            'id': 'evt_123',
+            'type': 'checkout.session.completed',
+            'data': {
+                'object': {
+                    'metadata': {'userId': 'user123', 'tier': 'bronze'},
+                    'subscription': 'sub_123'
+                }
+            }
+        }
+        
+        result = bee.validate_revenue(json.dumps(payload))
+        
+        self.assertIn('already processed', result)
+        handler.assert_not_called()
+    
+    def test_seen_event_skips_ledger(self):
+        """Test an event id handled by this process skips the Supabase ledger"""
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.supabase = MagicMock()
+        bee.supabase.rpc.return_value.execute.return_value.data = 'claimed'
+        bee._seen_events = OrderedDict()
+        bee._seen_lock = threading.Lock()
+        handler = Mock(return_value='handled')
+        bee._handlers = {'customer.subscription.updated': handler}
+        
+        payload = json.dumps({'id': 'evt_789', 'type': 'customer.subscription.updated', 'created': 1760572800, 'data': {'object': {}}})
+        
+        self.assertEqual(bee.validate_revenue(payload), 'handled')
+        bee.supabase.reset_mock()
+        
+        result = bee.validate_revenue(payload)
+        
+        self.assertIn('already processed', result)
+        handler.assert_called_once()
+        bee.supabase.rpc.assert_not_called()
+        bee.supabase.table.assert_not_called()
+    
+    def test_handled_event_marked_done(self):
+        """Test a claim is only marked done after the handler succeeds"""
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.supabase = MagicMock()
+        bee.supabase.rpc.return_value.execute.return_value.data = 'claimed'
+        bee._seen_events = OrderedDict()
+        bee._seen_lock = threading.Lock()
+        bee._handlers = {'customer.subscription.updated': Mock(side_effect=RuntimeError("boom"))}
+        
+        payload = json.dumps({'id': 'evt_321', 'type': 'customer.subscription.updated', 'data': {'object': {}}})
+        
+        with self.assertRaises(RuntimeError):
+            bee.validate_revenue(payload)
+        
+        # Failed handler: the claim is released, never marked done
+        bee.supabase.table.return_value.update.assert_not_called()
+        bee.supabase.table.return_value.delete.assert_called_once()
+        
+        bee._handlers['customer.subscription.updated'] = Mock(return_value='handled')
+        bee.validate_revenue(payload)
+        
+        bee.supabase.table.return_value.update.assert_called_once_with({'status': 'done'}, returning='minimal')
+    
+    def test_busy_event_is_not_answered_as_processed(self):
+        """Test a fresh claim held by another worker fails the attempt"""
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.supabase = MagicMock()
+        bee.supabase.rpc.return_value.execute.return_value.data = 'busy'
+        bee._seen_events = OrderedDict()
+        bee._seen_lock = threading.Lock()
+        handler = Mock()
+        bee._handlers = {'customer.subscription.updated': handler}
+        
+        payload = json.dumps({'id': 'evt_654', 'type': 'customer.subscription.updated', 'data': {'object': {}}})
+        
+        with self.assertRaises(RuntimeError):
+            bee.validate_revenue(payload)
+        
+        handler.assert_not_called()
+        bee.supabase.table.return_value.delete.assert_not_called()
+    
+    def test_unhandled_event_not_claimed(self):
+        """Test event types without a handler skip the event ledger"""
+        from finance_bee import FinanceBee
+        from guardian import Guardian
+        
+        bee = FinanceBee.__new__(FinanceBee)
+        bee.guardian = Guardian()
+        bee.supabase = MagicMock()
+        bee._handlers = {}
+        
+        payload = {'id': 'evt_456', 'type': 'invoice.created', 'data': {'object': {}}}
+        
+        result = bee.validate_revenue(json.dumps(payload))
+        
+        self.assertIn('no action taken', result)
+        bee.supabase.table.assert_not_called()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,111 @@
+"""
+Tests for resilience helpers
+"""
+
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# Add parent directory to path (once, so repeated imports don't grow sys.path)
+BEES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BEES_DIR not in sys.path:
+    sys.path.insert(0, BEES_DIR)
+
+from resilience import CircuitBreaker, CircuitOpenError, RetryBudget
+
+
+class TestRetryBudget(unittest.TestCase):
+    """Test retry token bucket"""
+
+    def test_grants_up_to_capacity(self):
+        """Test budget grants a burst of retries up to capacity"""
+        budget = RetryBudget(capacity=3, refill_per_second=0)
+
+        self.assertTrue(budget.try_acquire())
+        self.assertTrue(budget.try_acquire())
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+
+        stats = budget.get_stats()
+        self.assertEqual(stats['granted'], 3)
+        self.assertEqual(stats['denied'], 1)
+
+    @patch('resilience.time.monotonic')
+    def test_refills_over_time(self, mock_monotonic):
+        """Test tokens are regained at the refill rate"""
+        mock_monotonic.return_value = 100.0
+        budget = RetryBudget(capacity=1, refill_per_second=0.5)
+
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+
+        # Half a token after one second is not enough
+        mock_monotonic.return_value = 101.0
+        self.assertFalse(budget.try_acquire())
+
+        # A full token after two seconds
+        mock_monotonic.return_value = 103.0
+        self.assertTrue(budget.try_acquire())
+
+    @patch('resilience.time.monotonic')
+    def test_refill_capped_at_capacity(self, mock_monotonic):
+        """Test a long idle period does not bank more than capacity"""
+        mock_monotonic.return_value = 0.0
+        budget = RetryBudget(capacity=2, refill_per_second=1)
+
+        mock_monotonic.return_value = 3600.0
+        self.assertTrue(budget.try_acquire())
+        self.assertTrue(budget.try_acquire())
+        self.assertFalse(budget.try_acquire())
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test circuit breaker states"""
+
+    @patch('resilience.time.monotonic')
+    def test_opens_after_fail_max(self, mock_monotonic):
+        """Test consecutive failures open the circuit and calls are refused"""
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker('stripe', fail_max=2, reset_timeout=30)
+
+        breaker.before_call()
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        self.assertEqual(breaker.get_stats()['rejected'], 1)
+
+    @patch('resilience.time.monotonic')
+    def test_half_open_after_timeout(self, mock_monotonic):
+        """Test the circuit lets a call through after reset_timeout"""
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker('supabase', fail_max=1, reset_timeout=30)
+        breaker.record_failure()
+
+        mock_monotonic.return_value = 31.0
+        self.assertEqual(breaker.state, 'half-open')
+        breaker.before_call()
+
+        # A failed trial re-opens the circuit
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertEqual(breaker.get_stats()['opened'], 2)
+
+    @patch('resilience.time.monotonic')
+    def test_success_closes(self, mock_monotonic):
+        """Test a successful call closes the circuit and resets failures"""
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker('supabase', fail_max=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        self.assertEqual(breaker.state, 'closed')
+
+
+if __name__ == '__main__':
+    unittest.main()
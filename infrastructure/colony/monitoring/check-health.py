@@ -5,10 +5,18 @@ Colony OS Health Check Script
 Checks health of Colony Server and Finance Bee
 """
 
-import os
+import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from typing import Optional, TextIO
+
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from monitor_config import get_config
 
 try:
     import redis
@@ -16,26 +24,39 @@ except ImportError:
     print("⚠️ redis not installed. Skipping Redis checks.")
     redis = None
 
+# Optional D-Bus access to systemd (avoids spawning systemctl)
+try:
+    from pystemd.systemd1 import Unit
+except ImportError:
+    Unit = None
+
+# Shared HTTP session: keep-alive reuse across checks, and two retries with
+# exponential backoff so a single dropped connection doesn't fail the check
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=Retry(total=2, backoff_factor=0.5))
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
 
-def check_colony_server(server_host: str) -> bool:
+def check_colony_server(server_host: str, out: Optional[TextIO] = None) -> bool:
     """Check Colony Server health"""
     try:
-        response = requests.get(f"{server_host}/api/v1/health", timeout=5)
+        response = _SESSION.get(f"{server_host}/api/v1/health", timeout=5)
         if response.ok:
-            print("✅ Colony Server: Healthy")
+            print("✅ Colony Server: Healthy", file=out)
             return True
         else:
-            print(f"❌ Colony Server: Unhealthy (status {response.status_code})")
+            print(f"❌ Colony Server: Unhealthy (status {response.status_code})", file=out)
             return False
     except Exception as e:
-        print(f"❌ Colony Server: Down ({str(e)})")
+        print(f"❌ Colony Server: Down ({str(e)})", file=out)
         return False
 
 
-def check_finance_bee(redis_url: str, executor_name: str) -> bool:
+def check_finance_bee(redis_url: str, executor_name: str, out: Optional[TextIO] = None) -> bool:
     """Check Finance Bee heartbeat"""
     if not redis:
-        print("⚠️ Redis not available, skipping Finance Bee check")
+        print("⚠️ Redis not available, skipping Finance Bee check", file=out)
         return None
     
     try:
@@ -44,41 +65,53 @@ def check_finance_bee(redis_url: str, executor_name: str) -> bool:
         heartbeat = r.get(heartbeat_key)
         
         if heartbeat:
-            last_beat = datetime.fromisoformat(heartbeat.decode('utf-8'))
-            delta = (datetime.utcnow() - last_beat).total_seconds()
+            # Heartbeats are stored as Unix epoch seconds
+            delta = time.time() - int(heartbeat)
             
             if delta < 120:
-                print(f"✅ Finance Bee: Alive (last beat {delta:.0f}s ago)")
+                print(f"✅ Finance Bee: Alive (last beat {delta:.0f}s ago)", file=out)
                 return True
             else:
-                print(f"❌ Finance Bee: Dead (last beat {delta:.0f}s ago)")
+                print(f"❌ Finance Bee: Dead (last beat {delta:.0f}s ago)", file=out)
                 return False
         else:
-            print("❌ Finance Bee: No heartbeat found")
+            print("❌ Finance Bee: No heartbeat found", file=out)
             return False
     except Exception as e:
-        print(f"❌ Finance Bee: Error checking heartbeat ({str(e)})")
+        print(f"❌ Finance Bee: Error checking heartbeat ({str(e)})", file=out)
         return False
 
 
-def check_systemd_service(service_name: str) -> bool:
+def _systemd_unit_active(service_name: str) -> bool:
+    """Whether a systemd unit is active, via D-Bus (pystemd) or systemctl"""
+    if Unit is not None:
+        unit_name = service_name if '.' in service_name else f"{service_name}.service"
+        try:
+            unit = Unit(unit_name.encode())
+            unit.load()
+            return unit.Unit.ActiveState == b'active'
+        except Exception:
+            pass  # No system bus access; fall back to systemctl
+    
+    result = subprocess.run(
+        ['systemctl', 'is-active', service_name],
+        capture_output=True,
+        text=True
+    )
+    return result.returncode == 0
+
+
+def check_systemd_service(service_name: str, out: Optional[TextIO] = None) -> bool:
     """Check systemd service status"""
     try:
-        import subprocess
-        result = subprocess.run(
-            ['systemctl', 'is-active', service_name],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            print(f"✅ Systemd Service ({service_name}): Active")
+        if _systemd_unit_active(service_name):
+            print(f"✅ Systemd Service ({service_name}): Active", file=out)
             return True
         else:
-            print(f"❌ Systemd Service ({service_name}): Inactive")
+            print(f"❌ Systemd Service ({service_name}): Inactive", file=out)
             return False
     except Exception as e:
-        print(f"⚠️ Systemd check failed: {str(e)}")
+        print(f"⚠️ Systemd check failed: {str(e)}", file=out)
         return None
 
 
@@ -88,27 +121,35 @@ def main():
     print("=" * 50)
     print("")
     
-    # Configuration
-    colonies_server_host = os.environ.get('COLONIES_SERVER_HOST', 'http://localhost:8080')
-    redis_url = os.environ.get('REDIS_URL') or os.environ.get('UPSTASH_REDIS_URL')
-    executor_name = os.environ.get('EXECUTOR_NAME', 'zyeute-finance-bee-01')
-    service_name = 'zyeute-finance-bee'
+    config = get_config()
     
-    # Run checks
-    results = []
+    checks = [
+        ("1. Checking Colony Server...", check_colony_server, (config.colonies_server_host,)),
+        ("2. Checking Finance Bee (systemd)...", check_systemd_service, (config.service_name,)),
+    ]
+    if config.redis_url:
+        for number, executor_name in enumerate(config.executor_names, start=3):
+            checks.append((
+                f"{number}. Checking {executor_name} (heartbeat)...",
+                check_finance_bee,
+                (config.redis_url, executor_name),
+            ))
     
-    print("1. Checking Colony Server...")
-    results.append(check_colony_server(colonies_server_host))
-    print("")
+    # Run checks concurrently; each writes to its own buffer so the report
+    # prints in order
+    buffers = [StringIO() for _ in checks]
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        futures = [
+            pool.submit(check, *args, out=buffer)
+            for (_, check, args), buffer in zip(checks, buffers)
+        ]
     
-    print("2. Checking Finance Bee (systemd)...")
-    results.append(check_systemd_service(service_name))
-    print("")
-    
-    if redis_url:
-        print("3. Checking Finance Bee (heartbeat)...")
-        results.append(check_finance_bee(redis_url, executor_name))
+    results = []
+    for (title, _, _), buffer, future in zip(checks, buffers, futures):
+        print(title)
+        print(buffer.getvalue(), end="")
         print("")
+        results.append(future.result())
     
     # Summary
     print("=" * 50)
@@ -5,51 +5,33 @@ Colony OS Heartbeat Monitor
 Writes heartbeat data to Redis for real-time monitoring
 """
 
-import os
+import asyncio
 import time
 import sys
-from datetime import datetime
+from typing import List, Optional
 
 try:
     import redis
+    from redis import asyncio as aioredis
 except ImportError:
-    print("❌ redis not installed. Run: pip install redis")
+    print("❌ redis not installed. Run: pip install 'redis>=5.0.1'")
     sys.exit(1)
 
+from monitor_config import get_config
+
 
 class HeartbeatMonitor:
-    """Heartbeat monitor for Worker Bees"""
+    """Synchronous heartbeat access for Worker Bees (writes go through run())"""
     
     def __init__(self, executor_name: str, redis_url: str):
         self.executor_name = executor_name
         self.redis_client = redis.from_url(redis_url)
         self.heartbeat_key = f"executor:{executor_name}:heartbeat"
-        self.stats_key = f"executor:{executor_name}:stats"
-    
-    def send_heartbeat(self):
-        """Send heartbeat to Redis"""
-        try:
-            timestamp = datetime.utcnow().isoformat()
-            self.redis_client.set(self.heartbeat_key, timestamp, ex=120)  # Expire after 2 minutes
-            return True
-        except Exception as e:
-            print(f"⚠️ Failed to send heartbeat: {e}")
-            return False
-    
-    def update_stats(self, stats: dict):
-        """Update executor statistics in Redis"""
-        try:
-            self.redis_client.hset(self.stats_key, mapping=stats)
-            self.redis_client.expire(self.stats_key, 3600)  # Expire after 1 hour
-            return True
-        except Exception as e:
-            print(f"⚠️ Failed to update stats: {e}")
-            return False
     
-    def get_heartbeat(self) -> str:
-        """Get last heartbeat timestamp"""
+    def get_heartbeat(self) -> Optional[int]:
+        """Get last heartbeat timestamp (Unix epoch seconds)"""
         try:
-            return self.redis_client.get(self.heartbeat_key).decode('utf-8')
+            return int(self.redis_client.get(self.heartbeat_key))
         except:
             return None
     
@@ -59,46 +41,72 @@ class HeartbeatMonitor:
         if not heartbeat:
             return False
         
-        try:
-            last_beat = datetime.fromisoformat(heartbeat)
-            now = datetime.utcnow()
-            delta = (now - last_beat).total_seconds()
-            return delta < 120  # Alive if heartbeat within last 2 minutes
-        except:
-            return False
+        return time.time() - heartbeat < 120  # Alive if heartbeat within last 2 minutes
+
+
+async def send_heartbeats(client, executor_names: List[str]):
+    """
+    Write every executor's heartbeat in one Redis round trip
+    
+    Args:
+        client: redis.asyncio client
+        executor_names: Executors to mark alive
+    """
+    keys = [f"executor:{name}:heartbeat" for name in executor_names]
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.mset(dict.fromkeys(keys, int(time.time())))  # Unix epoch seconds
+        for key in keys:
+            pipe.expire(key, 120)  # Expire after 2 minutes
+        await pipe.execute()
+
+
+async def run(executor_names: List[str], redis_url: str, interval: int = 60):
+    """
+    Heartbeat loop for all executors, batched into one MSET per tick
+    
+    Args:
+        executor_names: Executors whose heartbeat keys are refreshed
+        redis_url: Redis connection URL
+        interval: Seconds between heartbeats
+    """
+    client = aioredis.from_url(redis_url)
+    try:
+        while True:
+            try:
+                await send_heartbeats(client, executor_names)
+                print(f"💓 Heartbeat sent for {len(executor_names)} executor(s) at {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}")
+                await asyncio.sleep(interval)  # Send heartbeat every 60 seconds
+            
+            except asyncio.CancelledError:
+                raise
+            
+            except Exception as e:
+                print(f"❌ Error in heartbeat loop: {e}")
+                await asyncio.sleep(5)
+    finally:
+        await client.aclose()
 
 
 def main():
     """Main heartbeat loop"""
-    executor_name = os.environ.get('EXECUTOR_NAME', 'zyeute-finance-bee-01')
-    redis_url = os.environ.get('REDIS_URL') or os.environ.get('UPSTASH_REDIS_URL')
+    config = get_config()
+    executor_names = list(config.executor_names)
+    redis_url = config.redis_url
     
     if not redis_url:
         print("❌ REDIS_URL or UPSTASH_REDIS_URL not set")
         sys.exit(1)
     
-    monitor = HeartbeatMonitor(executor_name, redis_url)
-    
-    print(f"💓 Heartbeat monitor starting for {executor_name}")
+    print(f"💓 Heartbeat monitor starting for {', '.join(executor_names)}")
     print(f"   Redis: {redis_url[:30]}...")
     print("")
     
-    while True:
-        try:
-            if monitor.send_heartbeat():
-                print(f"💓 Heartbeat sent at {datetime.utcnow().isoformat()}")
-            
-            time.sleep(60)  # Send heartbeat every 60 seconds
-        
-        except KeyboardInterrupt:
-            print("\n🛑 Heartbeat monitor stopping...")
-            sys.exit(0)
-        
-        except Exception as e:
-            print(f"❌ Error in heartbeat loop: {e}")
-            time.sleep(5)
+    try:
+        asyncio.run(run(executor_names, redis_url))
+    except KeyboardInterrupt:
+        print("\n🛑 Heartbeat monitor stopping...")
+        sys.exit(0)
 
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,46 @@
+"""
+Configuration for Colony OS monitoring scripts
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class MonitorConfig:
+    """Configuration shared by heartbeat.py and check-health.py"""
+
+    colonies_server_host: str = 'http://localhost:8080'
+    redis_url: Optional[str] = None
+    executor_name: str = 'zyeute-finance-bee-01'
+    executor_names: Tuple[str, ...] = ('zyeute-finance-bee-01',)  # every executor to beat for / check
+    service_name: str = 'zyeute-finance-bee'
+
+    @classmethod
+    def from_env(cls) -> 'MonitorConfig':
+        """Build configuration from environment variables"""
+        env = os.environ
+        executor_name = env.get('EXECUTOR_NAME', 'zyeute-finance-bee-01')
+        # EXECUTOR_NAMES (comma-separated) lets one monitor cover several bees
+        executor_names = tuple(
+            name.strip() for name in env.get('EXECUTOR_NAMES', '').split(',') if name.strip()
+        ) or (executor_name,)
+        return cls(
+            colonies_server_host=env.get('COLONIES_SERVER_HOST', 'http://localhost:8080'),
+            redis_url=env.get('REDIS_URL') or env.get('UPSTASH_REDIS_URL'),
+            executor_name=executor_name,
+            executor_names=executor_names,
+            service_name=env.get('SERVICE_NAME', 'zyeute-finance-bee'),
+        )
+
+    def __repr__(self):
+        # redis_url can carry credentials; keep it out of logs
+        return f"MonitorConfig(server={self.colonies_server_host}, executor={self.executor_name})"
+
+
+@lru_cache(maxsize=1)
+def get_config() -> MonitorConfig:
+    """Process-wide monitoring configuration, read from the environment on first use"""
+    return MonitorConfig.from_env()
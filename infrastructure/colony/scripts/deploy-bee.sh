@@ -102,6 +102,8 @@ WorkingDirectory=$INSTALL_DIR
 ExecStart=/usr/bin/python3 finance_bee.py
 Restart=always
 RestartSec=5
+# SIGTERM drains in-flight processes; allow for a full retry cycle
+TimeoutStopSec=120
 
 # Environment variables
 Environment="COLONIES_SERVER_HOST=${COLONIES_SERVER_HOST:-http://localhost:8080}"
@@ -112,7 +114,8 @@ Environment="SUPABASE_SERVICE_ROLE_KEY=${SUPABASE_SERVICE_ROLE_KEY}"
 Environment="STRIPE_SECRET_KEY=${STRIPE_SECRET_KEY}"
 Environment="EXECUTOR_NAME=zyeute-finance-bee-01"
 Environment="EXECUTOR_TYPE=finance-worker"
-Environment="POLL_TIMEOUT=10"
+Environment="POLL_TIMEOUT=60"
+Environment="MAX_CONCURRENCY=3"
 
 # Resource limits
 CPUShares=512
@@ -17,28 +17,40 @@ from unittest.mock import patch, Mock
 # These tests require Colony OS Server to be running
 # Run with: INTEGRATION_TEST=true python test_colony_flow.py
 
+REQUIRED_VARS = [
+    'COLONIES_SERVER_HOST',
+    'COLONIES_USER_PRVKEY',
+    'COLONIES_EXECUTOR_PRVKEY',
+    'SUPABASE_URL',
+    'SUPABASE_SERVICE_ROLE_KEY',
+]
+
+
+def _skip_reason():
+    """Why integration tests can't run here, or None if they can"""
+    if os.environ.get('INTEGRATION_TEST') != 'true':
+        return "Integration tests disabled. Set INTEGRATION_TEST=true to run."
+    
+    missing = [var for var in REQUIRED_VARS if not os.environ.get(var)]
+    if missing:
+        return f"Missing required environment variables: {', '.join(missing)}"
+    
+    return None
+
+
+# Checked once at import; every suite below shares the result
+SKIP_REASON = _skip_reason()
+
 class TestColonyIntegration(unittest.TestCase):
     """Integration tests for Colony OS flow"""
     
     @classmethod
     def setUpClass(cls):
         """Check if integration tests should run"""
-        if os.environ.get('INTEGRATION_TEST') != 'true':
-            raise unittest.SkipTest("Integration tests disabled. Set INTEGRATION_TEST=true to run.")
-        
-        # Verify required environment variables
-        required_vars = [
-            'COLONIES_SERVER_HOST',
-            'COLONIES_USER_PRVKEY',
-            'COLONIES_EXECUTOR_PRVKEY',
-            'SUPABASE_URL',
-            'SUPABASE_SERVICE_ROLE_KEY',
-        ]
-        
-        missing = [var for var in required_vars if not os.environ.get(var)]
-        if missing:
-            raise unittest.SkipTest(f"Missing required environment variables: {', '.join(missing)}")
+        if SKIP_REASON:
+            raise unittest.SkipTest(SKIP_REASON)
     
+    @unittest.skip('TODO: implement')
     def test_submit_task_to_colony(self):
         """Test submitting a task to Colony Server"""
         # This would use actual Colony OS client
@@ -50,6 +62,7 @@ class TestColonyIntegration(unittest.TestCase):
         
         self.assertTrue(True)  # Placeholder
     
+    @unittest.skip('TODO: implement')
     def test_finance_bee_picks_up_task(self):
         """Test Finance Bee picks up and executes task"""
         # This would verify the Finance Bee receives the task
@@ -58,6 +71,7 @@ class TestColonyIntegration(unittest.TestCase):
         # TODO: Implement with actual Finance Bee instance
         self.assertTrue(True)  # Placeholder
     
+    @unittest.skip('TODO: implement')
     def test_end_to_end_stripe_webhook(self):
         """Test complete flow from Stripe webhook to Supabase update"""
         # This would:
@@ -75,9 +89,10 @@ class TestTaskRetry(unittest.TestCase):
     
     @classmethod
     def setUpClass(cls):
-        if os.environ.get('INTEGRATION_TEST') != 'true':
-            raise unittest.SkipTest("Integration tests disabled")
+        if SKIP_REASON:
+            raise unittest.SkipTest(SKIP_REASON)
     
+    @unittest.skip('TODO: implement')
     def test_task_retry_on_failure(self):
         """Test task is retried if it fails"""
         # TODO: Implement retry test
@@ -89,9 +104,10 @@ class TestConcurrentTasks(unittest.TestCase):
     
     @classmethod
     def setUpClass(cls):
-        if os.environ.get('INTEGRATION_TEST') != 'true':
-            raise unittest.SkipTest("Integration tests disabled")
+        if SKIP_REASON:
+            raise unittest.SkipTest(SKIP_REASON)
     
+    @unittest.skip('TODO: implement')
     def test_multiple_concurrent_tasks(self):
         """Test multiple tasks execute concurrently"""
         # TODO: Implement concurrent task test
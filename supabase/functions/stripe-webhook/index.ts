@@ -5,14 +5,25 @@
 
 import { serve } from 'https://deno.land/std@0.168.0/http/server.ts';
 import Stripe from 'https://esm.sh/stripe@14.21.0?target=deno';
+import { createClient } from 'https://esm.sh/@supabase/supabase-js@2';
 
 const stripe = new Stripe(Deno.env.get('STRIPE_SECRET_KEY') || '', {
   apiVersion: '2024-11-20.acacia',
   httpClient: Stripe.createFetchHttpClient(),
 });
 
+// Deno only offers async (SubtleCrypto) HMAC, so signatures are verified
+// with constructEventAsync
+const cryptoProvider = Stripe.createSubtleCryptoProvider();
+
 const webhookSecret = Deno.env.get('STRIPE_WEBHOOK_SECRET') || '';
 
+// Created once per isolate and reused across requests
+const supabaseAdmin = createClient(
+  Deno.env.get('SUPABASE_URL') || '',
+  Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') || ''
+);
+
 serve(async (req) => {
   const signature = req.headers.get('stripe-signature');
   if (!signature) {
@@ -21,12 +32,12 @@ serve(async (req) => {
 
   try {
     const body = await req.text();
-    const event = stripe.webhooks.constructEvent(body, signature, webhookSecret);
-
-    const { createClient } = await import('https://esm.sh/@supabase/supabase-js@2');
-    const supabaseAdmin = createClient(
-      Deno.env.get('SUPABASE_URL') || '',
-      Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') || ''
+    const event = await stripe.webhooks.constructEventAsync(
+      body,
+      signature,
+      webhookSecret,
+      undefined,
+      cryptoProvider
     );
 
     // Handle checkout.session.completed
@@ -46,42 +57,27 @@ serve(async (req) => {
       const currentPeriodStart = new Date(subscription.current_period_start * 1000).toISOString();
       const currentPeriodEnd = new Date(subscription.current_period_end * 1000).toISOString();
 
-      // Update user profile with subscription info
-      const { error: profileError } = await supabaseAdmin
-        .from('user_profiles')
-        .update({
-          subscription_tier: tier,
-          is_premium: true,
-        })
-        .eq('id', userId);
-
-      if (profileError) {
-        console.error('Error updating user_profiles:', profileError);
+      // Upgrade profile and record subscription in one transaction
+      const { data: activated, error: activateError } = await supabaseAdmin.rpc('activate_subscription', {
+        p_user_id: userId,
+        p_tier: tier,
+        p_subscription_id: subscriptionId,
+        p_customer_id: session.customer as string,
+        p_period_start: currentPeriodStart,
+        p_period_end: currentPeriodEnd,
+      });
+
+      if (activateError) {
+        console.error('Error activating subscription:', activateError);
         return new Response('Error updating profile', { status: 500 });
       }
 
-      // Also try to create subscription record in subscriptions table (for tracking)
-      // This is optional - the main update is to user_profiles
-      const { error: subError } = await supabaseAdmin
-        .from('subscriptions')
-        .upsert({
-          subscriber_id: userId,
-          creator_id: userId, // Self-subscription for premium tiers
-          status: 'active',
-          stripe_subscription_id: subscriptionId,
-          stripe_customer_id: session.customer as string,
-          current_period_start: currentPeriodStart,
-          current_period_end: currentPeriodEnd,
-        }, {
-          onConflict: 'stripe_subscription_id',
-        });
-
-      if (subError) {
-        console.warn('Note: Could not create subscription record:', subError);
-        // This is OK - the main update is to user_profiles which succeeded
+      // A missing profile is not fixed by Stripe retrying; acknowledge and log
+      if (!activated) {
+        console.error(`Subscription ${subscriptionId} not activated: no profile for user ${userId}`);
+      } else {
+        console.log(`Subscription activated for user ${userId}: ${tier}`);
       }
-
-      console.log(`Subscription activated for user ${userId}: ${tier}`);
     }
 
     // Handle subscription updates
@@ -111,18 +107,21 @@ serve(async (req) => {
       const userId = subscription.metadata?.userId;
 
       if (userId) {
-        await supabaseAdmin
-          .from('subscriptions')
-          .update({ status: 'canceled' })
-          .eq('stripe_subscription_id', subscription.id);
+        // Cancel subscription and downgrade profile in one transaction
+        const { data: canceled, error: cancelError } = await supabaseAdmin.rpc('cancel_subscription', {
+          p_user_id: userId,
+          p_subscription_id: subscription.id,
+        });
 
-        await supabaseAdmin
-          .from('user_profiles')
-          .update({
-            subscription_tier: null,
-            is_premium: false,
-          })
-          .eq('id', userId);
+        if (cancelError) {
+          console.error('Error canceling subscription:', cancelError);
+          return new Response('Error canceling subscription', { status: 500 });
+        }
+
+        // Same as activation: log a missing profile, don't ask Stripe to retry
+        if (!canceled) {
+          console.error(`Subscription ${subscription.id} not canceled: no profile for user ${userId}`);
+        }
       }
     }
 
@@ -0,0 +1,80 @@
+-- ============================================
+-- Processed Stripe Events
+-- Idempotency ledger for the Colony OS Finance Bee
+-- ============================================
+--
+-- Stripe delivers webhooks at least once and the Colony task queue can
+-- re-dispatch on restart. The Finance Bee claims each Stripe event id here
+-- through claim_stripe_event() before doing any work. A claim starts as
+-- 'processing' and becomes 'done' only after the handler succeeds; a 'done'
+-- row means the event was already processed and the task short-circuits.
+-- A 'processing' claim older than the stale window was abandoned (bee killed
+-- mid-handler, failed release) and is taken over by the next delivery.
+
+CREATE TABLE IF NOT EXISTS processed_stripe_events (
+  event_id TEXT PRIMARY KEY, -- Stripe event id (evt_...)
+  event_type TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'processing' CHECK (status IN ('processing', 'done')),
+  claimed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  processed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Index for retention cleanup
+CREATE INDEX IF NOT EXISTS idx_processed_stripe_events_processed_at ON processed_stripe_events(processed_at);
+
+-- Enable RLS (only the service role used by worker bees touches this table)
+ALTER TABLE processed_stripe_events ENABLE ROW LEVEL SECURITY;
+
+-- Claim an event id. Returns:
+--   'claimed' - caller owns the event (new, or a stale 'processing' claim)
+--   'done'    - already handled
+--   'busy'    - another worker holds a fresh 'processing' claim
+CREATE OR REPLACE FUNCTION claim_stripe_event(
+  p_event_id TEXT,
+  p_event_type TEXT,
+  p_stale_after_seconds INTEGER DEFAULT 300
+)
+RETURNS TEXT AS $$
+DECLARE
+  v_status TEXT;
+BEGIN
+  INSERT INTO processed_stripe_events (event_id, event_type, status, claimed_at)
+  VALUES (p_event_id, p_event_type, 'processing', NOW())
+  ON CONFLICT (event_id) DO UPDATE
+  SET claimed_at = NOW()
+  WHERE processed_stripe_events.status = 'processing'
+    AND processed_stripe_events.claimed_at < NOW() - make_interval(secs => p_stale_after_seconds);
+
+  IF FOUND THEN
+    RETURN 'claimed';
+  END IF;
+
+  SELECT status INTO v_status FROM processed_stripe_events WHERE event_id = p_event_id;
+  RETURN CASE WHEN v_status = 'done' THEN 'done' ELSE 'busy' END;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Function to purge old claims. Stripe stops retrying after 3 days, so
+-- 30 days of history is plenty. Schedule with pg_cron, e.g.:
+--   SELECT cron.schedule('purge-processed-stripe-events', '0 4 * * *',
+--                        'SELECT purge_processed_stripe_events()');
+CREATE OR REPLACE FUNCTION purge_processed_stripe_events(retention INTERVAL DEFAULT INTERVAL '30 days')
+RETURNS INTEGER AS $$
+DECLARE
+  deleted_count INTEGER;
+BEGIN
+  DELETE FROM processed_stripe_events
+  WHERE processed_at < NOW() - retention;
+
+  GET DIAGNOSTICS deleted_count = ROW_COUNT;
+  RETURN deleted_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Grant permissions (UPDATE marks claims done)
+GRANT SELECT, INSERT, UPDATE, DELETE ON processed_stripe_events TO service_role;
+GRANT EXECUTE ON FUNCTION claim_stripe_event TO service_role;
+GRANT EXECUTE ON FUNCTION purge_processed_stripe_events TO service_role;
+
+COMMENT ON TABLE processed_stripe_events IS 'Stripe webhook event ids claimed or handled by the Finance Bee (idempotency ledger)';
+COMMENT ON FUNCTION claim_stripe_event IS 'Claim a Stripe event id for processing; stale processing claims are reclaimable';
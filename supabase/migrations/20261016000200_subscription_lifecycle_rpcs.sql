@@ -0,0 +1,107 @@
+-- ============================================
+-- activate_subscription() / cancel_subscription()
+-- Single-round-trip subscription writes for the Colony OS Finance Bee
+-- ============================================
+--
+-- Each Stripe lifecycle event touches both user_profiles and subscriptions.
+-- Doing the two writes inside one function makes them a single PostgREST
+-- call and a single transaction, so the bee no longer needs compensating
+-- rollbacks when the second write fails.
+
+-- checkout.session.completed: grant the tier and record the subscription.
+-- Returns FALSE (and writes nothing) if the user profile does not exist.
+--
+-- subscriptions is unique per (subscriber_id, creator_id), and platform
+-- subscriptions use the user for both. A user who cancels and checks out
+-- again gets a new Stripe subscription id, so the upsert targets that pair
+-- and moves the existing row to the new subscription:
+--   1. checkout (sub_A)  -> row inserted, stripe_subscription_id = sub_A
+--   2. cancel (sub_A)    -> row status = 'canceled'
+--   3. checkout (sub_B)  -> same row, stripe_subscription_id = sub_B,
+--                           status = 'active', canceled_at cleared
+-- A redelivered checkout for the current subscription rewrites the same
+-- values.
+CREATE OR REPLACE FUNCTION activate_subscription(
+  p_user_id UUID,
+  p_tier TEXT,
+  p_subscription_id TEXT,
+  p_customer_id TEXT,
+  p_period_start TIMESTAMPTZ,
+  p_period_end TIMESTAMPTZ
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE user_profiles
+  SET
+    subscription_tier = p_tier,
+    is_premium = TRUE
+  WHERE id = p_user_id;
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  INSERT INTO subscriptions (
+    subscriber_id,
+    creator_id,
+    status,
+    stripe_subscription_id,
+    stripe_customer_id,
+    current_period_start,
+    current_period_end
+  )
+  VALUES (
+    p_user_id,
+    p_user_id,
+    'active',
+    p_subscription_id,
+    p_customer_id,
+    p_period_start,
+    p_period_end
+  )
+  ON CONFLICT (subscriber_id, creator_id) DO UPDATE
+  SET
+    stripe_subscription_id = EXCLUDED.stripe_subscription_id,
+    status = EXCLUDED.status,
+    stripe_customer_id = EXCLUDED.stripe_customer_id,
+    current_period_start = EXCLUDED.current_period_start,
+    current_period_end = EXCLUDED.current_period_end,
+    canceled_at = NULL,
+    updated_at = NOW();
+
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- customer.subscription.deleted: cancel the subscription and clear the tier.
+-- Returns FALSE (and writes nothing) if the user profile does not exist.
+CREATE OR REPLACE FUNCTION cancel_subscription(
+  p_user_id UUID,
+  p_subscription_id TEXT
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE user_profiles
+  SET
+    subscription_tier = NULL,
+    is_premium = FALSE
+  WHERE id = p_user_id;
+
+  IF NOT FOUND THEN
+    RETURN FALSE;
+  END IF;
+
+  UPDATE subscriptions
+  SET status = 'canceled'
+  WHERE stripe_subscription_id = p_subscription_id;
+
+  RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Grant permissions
+GRANT EXECUTE ON FUNCTION activate_subscription TO service_role;
+GRANT EXECUTE ON FUNCTION cancel_subscription TO service_role;
+
+COMMENT ON FUNCTION activate_subscription IS 'Grant a premium tier and upsert its Stripe subscription in one transaction';
+COMMENT ON FUNCTION cancel_subscription IS 'Cancel a Stripe subscription and clear the premium tier in one transaction';
@@ -0,0 +1,30 @@
+-- ============================================
+-- Stripe Events Dead Letter Queue
+-- Parking table for tasks the Colony OS Finance Bee could not process
+-- ============================================
+--
+-- When a task cannot succeed (bad payload, missing profile) or still fails
+-- after several Colony dispatches, the bee records it here and only then
+-- fails the Colony process instead of letting it be re-dispatched forever.
+-- Rows are kept for manual inspection and replay.
+
+CREATE TABLE IF NOT EXISTS dlq_stripe_events (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  event_id TEXT, -- Stripe event id (evt_...), if the payload had one
+  funcname TEXT NOT NULL, -- Colony task function that failed
+  payload JSONB,
+  error TEXT NOT NULL,
+  failed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Indexes for triage
+CREATE INDEX IF NOT EXISTS idx_dlq_stripe_events_failed_at ON dlq_stripe_events(failed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_dlq_stripe_events_event_id ON dlq_stripe_events(event_id);
+
+-- Enable RLS (only the service role used by worker bees touches this table)
+ALTER TABLE dlq_stripe_events ENABLE ROW LEVEL SECURITY;
+
+-- Grant permissions
+GRANT SELECT, INSERT, DELETE ON dlq_stripe_events TO service_role;
+
+COMMENT ON TABLE dlq_stripe_events IS 'Finance Bee tasks that failed after retries, parked for inspection and replay';